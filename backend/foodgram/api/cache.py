@@ -0,0 +1,196 @@
+from functools import wraps
+from hashlib import md5
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.utils import get_query_list
+from recipes.counters import get_counter_version_name
+from recipes.models import Recipe
+from recipes.versions import get_modified, get_version
+
+SPARSE_FIELDS_PARAMS = ('fields', 'omit', 'view')
+RECIPE_LIST_PARAMS = ('author', 'cursor', 'limit', 'ordering', 'page',
+                      'search', 'tags') + SPARSE_FIELDS_PARAMS
+RECIPE_COUNTERS = ('favorites_count', 'carts_count')
+
+
+def count(name):
+    """Увеличивает счётчик обращений к кэшу."""
+    key = f'recipe_cache:{name}'
+    cache.add(key, 0, None)
+    return cache.incr(key)
+
+
+def get_cache_stats():
+    """Возвращает количество попаданий и промахов кэша рецептов."""
+    return {
+        name: cache.get(f'recipe_cache:{name}', 0)
+        for name in ('hits', 'misses')
+    }
+
+
+def get_query_key(request, names):
+    """Нормализованные параметры запроса из names."""
+    params = [
+        (name, sorted(set(request.query_params.getlist(name))))
+        for name in names if name in request.query_params
+    ]
+    return urlencode(params, doseq=True)
+
+
+def get_list_key(request):
+    """Ключ кэша списка рецептов по нормализованным параметрам запроса.
+    Зависит от версии рецептов и версии ингредиентов,
+    названия которых входят в ответ, а при сортировке
+    по счётчикам - и от версий этих счётчиков.
+    """
+    query = md5(
+        f'{request.get_host()}?'
+        f'{get_query_key(request, RECIPE_LIST_PARAMS)}'.encode()
+    ).hexdigest()
+    names = ['recipes', 'ingredients']
+    ordering = {
+        name.lstrip('-') for name in get_query_list(request, 'ordering')
+    }
+    names += [
+        get_counter_version_name(counter)
+        for counter in RECIPE_COUNTERS if counter in ordering
+    ]
+    versions = ':'.join(str(get_version(name)) for name in names)
+    return f'recipes:list:{versions}:{query}'
+
+
+def get_detail_key(request, pk):
+    """Ключ кэша рецепта. Зависит от версий данных,
+    входящих в представление рецепта, и от набора запрошенных полей.
+    """
+    fields = md5(
+        get_query_key(request, SPARSE_FIELDS_PARAMS).encode()
+    ).hexdigest()
+    versions = ':'.join(
+        str(get_version(name))
+        for name in get_recipe_version_names(request, pk)
+    )
+    return f'recipes:detail:{request.get_host()}:{pk}:{fields}:{versions}'
+
+
+def cached_response(key, get_response):
+    """Возвращает закэшированный ответ либо формирует и кэширует новый."""
+    data = cache.get(key)
+    if data is not None:
+        count('hits')
+        response = Response(data)
+        response['X-Cache'] = 'HIT'
+        return response
+    count('misses')
+    response = get_response()
+    if response.status_code == status.HTTP_200_OK:
+        cache.set(key, response.data, settings.RECIPE_CACHE_TIMEOUT)
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+def get_etag(*parts):
+    return md5(':'.join(map(str, parts)).encode()).hexdigest()
+
+
+def tags_etag(request, *args, **kwargs):
+    return get_etag('tags', get_version('tags'))
+
+
+def tags_last_modified(request, *args, **kwargs):
+    return get_modified('tags')
+
+
+def ingredients_etag(request, *args, **kwargs):
+    return get_etag('ingredients', get_version('ingredients'))
+
+
+def ingredients_last_modified(request, *args, **kwargs):
+    return get_modified('ingredients')
+
+
+def get_recipe_updated_at(request, pk):
+    """Время изменения рецепта, запрашивается один раз за запрос."""
+    if not hasattr(request, 'recipe_updated_at'):
+        try:
+            request.recipe_updated_at = Recipe.objects.filter(
+                pk=pk
+            ).values_list('updated_at', flat=True).first()
+        except ValueError:
+            request.recipe_updated_at = None
+    return request.recipe_updated_at
+
+
+def get_recipe_version_names(request, pk):
+    """Версии данных, от которых зависит представление рецепта:
+    теги и авторы, ингредиенты, сам рецепт и готовность
+    уменьшенных копий его изображения.
+    """
+    names = ['recipe_relations', 'ingredients', f'recipe:{pk}']
+    if request.user.is_authenticated:
+        names.append(f'user:{request.user.id}')
+    return names
+
+
+def recipe_etag(request, pk, **kwargs):
+    updated_at = get_recipe_updated_at(request, pk)
+    if updated_at is None:
+        return None
+    return get_etag(
+        'recipe', pk, updated_at.isoformat(), request.user.id,
+        get_query_key(request, SPARSE_FIELDS_PARAMS),
+        *[get_version(name)
+          for name in get_recipe_version_names(request, pk)]
+    )
+
+
+def recipe_last_modified(request, pk, **kwargs):
+    updated_at = get_recipe_updated_at(request, pk)
+    if updated_at is None:
+        return None
+    return max(
+        updated_at,
+        *[get_modified(name)
+          for name in get_recipe_version_names(request, pk)]
+    )
+
+
+def idempotent(view_method):
+    """Повторный запрос с тем же заголовком Idempotency-Key
+    получает сохранённый ответ вместо повторного выполнения.
+    Пока первый запрос выполняется, повтор получает 409.
+    """
+    @wraps(view_method)
+    def wrapper(view, request, *args, **kwargs):
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if not idempotency_key or not request.user.is_authenticated:
+            return view_method(view, request, *args, **kwargs)
+        key = 'idempotency:' + get_etag(
+            request.user.id, request.method, request.path, idempotency_key
+        )
+        stored = cache.get(key)
+        if stored is not None:
+            status_code, data = stored
+            response = Response(data, status=status_code)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+        lock_key = f'{key}:lock'
+        if not cache.add(lock_key, True, settings.IDEMPOTENCY_LOCK_TIMEOUT):
+            return Response(
+                {'errors': 'Запрос с этим ключом уже выполняется'},
+                status=status.HTTP_409_CONFLICT
+            )
+        try:
+            response = view_method(view, request, *args, **kwargs)
+            if response.status_code < status.HTTP_500_INTERNAL_SERVER_ERROR:
+                cache.set(key, (response.status_code, response.data),
+                          settings.IDEMPOTENCY_KEY_TIMEOUT)
+        finally:
+            cache.delete(lock_key)
+        return response
+    return wrapper
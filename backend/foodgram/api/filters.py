@@ -1,6 +1,11 @@
+from django.conf import settings
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import filters, FilterSet
+from rest_framework.filters import OrderingFilter
 
+from recipes.indexes import tag_recipe_index
 from recipes.models import Ingredient, Recipe, Tag
+from recipes.search import search_recipes
 
 
 class RecipeFilter(FilterSet):
@@ -8,6 +13,7 @@ class RecipeFilter(FilterSet):
         queryset=Tag.objects.all(),
         field_name='tags__slug',
         to_field_name='slug',
+        method='get_tags',
     )
     is_favorited = filters.BooleanFilter(
         method='get_is_favorited'
@@ -15,10 +21,26 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='get_search')
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+                  'search')
+
+    def get_tags(self, queryset, name, value):
+        """Фильтрует по тегам через индекс тег -> рецепты.
+        Если рецептов слишком много для списка id,
+        используется подзапрос EXISTS без DISTINCT.
+        """
+        if not value:
+            return queryset
+        tag_ids = [tag.id for tag in value]
+        if tag_recipe_index.count(tag_ids) > settings.TAG_FILTER_MAX_IDS:
+            return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+                recipe=OuterRef('pk'), tag__in=tag_ids
+            )))
+        return queryset.filter(id__in=tag_recipe_index.get_recipe_ids(tag_ids))
 
     def get_is_favorited(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
@@ -30,6 +52,26 @@ class RecipeFilter(FilterSet):
             return queryset.filter(carts__user=self.request.user)
         return queryset
 
+    def get_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+
+class RecipeOrderingFilter(OrderingFilter):
+    """Сортировка рецептов по параметру ordering.
+    Без параметра порядок не меняется, чтобы не сбивать
+    ранжирование поиска. При равных значениях новые рецепты идут первыми.
+    """
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering and not {'id', '-id'} & set(ordering):
+            ordering = [*ordering, '-id']
+        return ordering
+
+    def filter_queryset(self, request, queryset, view):
+        if self.ordering_param not in request.query_params:
+            return queryset
+        return super().filter_queryset(request, queryset, view)
+
 
 class IngredientFilter(FilterSet):
     name = filters.CharFilter(lookup_expr='istartswith')
@@ -0,0 +1,14 @@
+from django.core.management import BaseCommand
+
+from api.snapshots import SNAPSHOTS, write_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Writing static JSON snapshots of tags and ingredients'
+
+    def handle(self, *args, **options):
+        for kind in SNAPSHOTS:
+            write_snapshots(kind)
+        self.stdout.write(self.style.SUCCESS(
+            f'Snapshots written: {", ".join(SNAPSHOTS)}'
+        ))
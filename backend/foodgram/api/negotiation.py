@@ -0,0 +1,14 @@
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+
+
+class FallbackContentNegotiation(DefaultContentNegotiation):
+    """Если заголовок Accept не подходит ни одному формату,
+    ответ отдаётся в первом из них вместо ошибки 406.
+    Неизвестный формат в параметре format по-прежнему даёт 404.
+    """
+    def select_renderer(self, request, renderers, format_suffix=None):
+        try:
+            return super().select_renderer(request, renderers, format_suffix)
+        except NotAcceptable:
+            return renderers[0], renderers[0].media_type
@@ -1,5 +1,92 @@
-from rest_framework.pagination import PageNumberPagination
+from collections import OrderedDict
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import (BasePagination, CursorPagination,
+                                       PageNumberPagination)
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 
 
 class PageLimitPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+class RecipeCursorPagination(CursorPagination):
+    ordering = '-id'
+    page_size_query_param = 'limit'
+
+
+class RecipePagination(PageLimitPagination):
+    """Постраничная пагинация рецептов.
+    При наличии параметра cursor используется курсорная пагинация
+    по id, которая не считает общее количество рецептов.
+    """
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = RecipeCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class RecipeFeedPagination(BasePagination):
+    """Пагинация ленты по ключу: параметр before содержит
+    id последнего показанного рецепта.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    before_query_param = 'before'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_before(self, request):
+        before = request.query_params.get(self.before_query_param)
+        if before is None:
+            return None
+        try:
+            return int(before)
+        except ValueError:
+            raise ValidationError(
+                {self.before_query_param: ['Некорректный параметр before']}
+            )
+
+    def paginate_queryset(self, recipe_ids, request, view=None):
+        """Принимает на один id больше размера страницы,
+        чтобы узнать, есть ли следующая.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        self.has_next = len(recipe_ids) > page_size
+        recipe_ids = list(recipe_ids)[:page_size]
+        self.last_id = recipe_ids[-1] if recipe_ids else None
+        return recipe_ids
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.before_query_param, self.last_id
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
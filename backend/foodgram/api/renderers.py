@@ -0,0 +1,150 @@
+import csv
+import json
+import os
+from abc import ABC, abstractmethod
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework import renderers
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CHUNK_SIZE = 64 * 1024
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """JSON-ответы через orjson, если он установлен.
+    Вывод совпадает с JSONRenderer побайтно, кроме записи float
+    в экспоненциальной форме, которых в API нет. Ответы с отступами
+    и значения, которые orjson не поддерживает, отдаются JSONRenderer.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii
+                or not self.compact or self.get_indent(
+                    accepted_media_type, renderer_context or {}
+                ) is not None):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=(orjson.OPT_PASSTHROUGH_DATETIME
+                        | orjson.OPT_PASSTHROUGH_DATACLASS)
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        return ret.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace('\u2029'.encode(), b'\\u2029')
+
+
+class Echo:
+    """Псевдобуфер, который сразу возвращает записанную строку."""
+    def write(self, value):
+        return value
+
+
+class ShoppingCartRenderer(renderers.BaseRenderer, ABC):
+    """Базовый класс для выгрузки списка покупок.
+    Сам файл отдаётся потоком через stream(),
+    render() используется только для ответов с ошибками.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+    @abstractmethod
+    def stream(self, ingredients):
+        """Части файла для StreamingHttpResponse."""
+
+
+class ShoppingCartTextRenderer(ShoppingCartRenderer):
+    """Список покупок в виде текстового файла."""
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, ingredients):
+        yield 'Список покупок:\n'
+        for ingredient in ingredients:
+            name = ingredient['ingredient__name']
+            unit = ingredient['ingredient__measurement_unit']
+            amount = ingredient['ingredient_amount']
+            yield f'\n{name} - {amount}, {unit}'
+
+
+class ShoppingCartCSVRenderer(ShoppingCartRenderer):
+    """Список покупок в формате CSV."""
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(
+            ('Ингредиент', 'Единица измерения', 'Количество')
+        )
+        for ingredient in ingredients:
+            yield writer.writerow((
+                ingredient['ingredient__name'],
+                ingredient['ingredient__measurement_unit'],
+                ingredient['ingredient_amount'],
+            ))
+
+
+class ShoppingCartPDFRenderer(ShoppingCartRenderer):
+    """Список покупок в формате PDF.
+    reportlab дописывает таблицу ссылок только в save(), поэтому
+    документ не отдаётся постранично, а собирается во временном
+    файле, который при большом размере сбрасывается на диск.
+    """
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    font_size = 12
+    line_height = 18
+    margin = 50
+
+    def get_font(self):
+        font_path = settings.SHOPPING_CART_PDF_FONT
+        if not os.path.exists(font_path):
+            return 'Helvetica'
+        if 'ShoppingCartFont' not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(TTFont('ShoppingCartFont', font_path))
+        return 'ShoppingCartFont'
+
+    def stream(self, ingredients):
+        font = self.get_font()
+        width, height = A4
+        with SpooledTemporaryFile(max_size=CHUNK_SIZE * 16) as buffer:
+            pdf = canvas.Canvas(buffer, pagesize=A4)
+            pdf.setFont(font, self.font_size)
+            y = height - self.margin
+            pdf.drawString(self.margin, y, 'Список покупок:')
+            for ingredient in ingredients:
+                y -= self.line_height
+                if y < self.margin:
+                    pdf.showPage()
+                    pdf.setFont(font, self.font_size)
+                    y = height - self.margin
+                name = ingredient['ingredient__name']
+                unit = ingredient['ingredient__measurement_unit']
+                amount = ingredient['ingredient_amount']
+                pdf.drawString(self.margin, y, f'{name} - {amount}, {unit}')
+            pdf.save()
+            buffer.seek(0)
+            while True:
+                chunk = buffer.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
@@ -1,15 +1,122 @@
-from django.db import transaction
+from operator import attrgetter
+
+from django.db import IntegrityError, transaction
+from django.db.models import QuerySet
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
-from rest_framework.validators import UniqueTogetherValidator
+from rest_framework.settings import api_settings
 
-from api.utils import Base64ImageField, create_ingredients
+from api.utils import (DUPLICATE_INGREDIENT_MESSAGE, Base64ImageField,
+                       RenditionImageField, create_ingredients,
+                       get_query_list, get_recent_recipes,
+                       update_ingredients)
+from recipes.indexes import recipe_ingredient_index
 from recipes.models import (Favorite, Ingredient,
                             Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+                            ShoppingCart, ShoppingListItem, Tag)
 from users.models import User, Subscription
 
 
+class SparseFieldsMixin:
+    """Выбор полей ответа параметрами запроса:
+    ?fields= оставляет только перечисленные поля,
+    ?omit= исключает поля, ?view= выбирает набор полей из views.
+    Действует только на сериализатор верхнего уровня,
+    вложенные сериализаторы отдают все поля.
+    """
+    views = {}
+
+    @classmethod
+    def select_fields(cls, names, request):
+        """Имена полей из names, которые нужно вернуть в ответе."""
+        view = cls.views.get(request.query_params.get('view'))
+        if view is not None:
+            names = [name for name in names if name in view]
+        fields = get_query_list(request, 'fields')
+        if fields:
+            names = [name for name in names if name in fields]
+        omit = get_query_list(request, 'omit')
+        return [name for name in names if name not in omit]
+
+    def is_top_level(self):
+        parent = getattr(self, 'parent', None)
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or not self.is_top_level():
+            return fields
+        return {
+            name: fields[name] for name in self.select_fields(fields, request)
+        }
+
+
+class FastReadMixin:
+    """Быстрое представление объекта без обхода полей DRF.
+    Простые поля модели читаются прямо из атрибутов,
+    методы SerializerMethodField вызываются напрямую,
+    остальные поля отдаются своему to_representation.
+    Результат совпадает с представлением ModelSerializer.
+    """
+    plain_field_classes = (serializers.BooleanField, serializers.CharField,
+                           serializers.IntegerField)
+
+    def get_plain_sources(self):
+        """Пути к атрибутам полей, если все поля простые, иначе None."""
+        sources = {}
+        for name, field in self.fields.items():
+            if field.write_only:
+                continue
+            if (not isinstance(field, self.plain_field_classes)
+                    or field.source == '*'):
+                return None
+            sources[name] = field.source_attrs
+        return sources
+
+    def get_getter(self, field):
+        if (isinstance(field, self.plain_field_classes)
+                and field.source != '*'):
+            return attrgetter('.'.join(field.source_attrs))
+        if isinstance(field, serializers.SerializerMethodField):
+            return getattr(self, field.method_name)
+
+        def represent(instance):
+            attribute = field.get_attribute(instance)
+            if attribute is None:
+                return None
+            return field.to_representation(attribute)
+        return represent
+
+    def to_representation(self, instance):
+        if not hasattr(self, '_getters'):
+            self._getters = [
+                (name, self.get_getter(field))
+                for name, field in self.fields.items()
+                if not field.write_only
+            ]
+        return {name: getter(instance) for name, getter in self._getters}
+
+
+class FastReadListSerializer(serializers.ListSerializer):
+    """Список для FastReadMixin. Запрос верхнего уровня,
+    в котором все поля простые, читается через values_list
+    без создания объектов моделей.
+    """
+    def to_representation(self, data):
+        if self.parent is None and isinstance(data, QuerySet):
+            sources = self.child.get_plain_sources()
+            if sources is not None:
+                return [
+                    dict(zip(sources, row)) for row in data.values_list(
+                        *['__'.join(source) for source in sources.values()]
+                    )
+                ]
+        return super().to_representation(data)
+
+
 class UserSignUpSerializer(UserCreateSerializer):
     """Сериализатор для регистрации пользователей."""
     class Meta:
@@ -18,7 +125,7 @@ class UserSignUpSerializer(UserCreateSerializer):
                   'last_name', 'password')
 
 
-class UserGetSerializer(UserSerializer):
+class UserGetSerializer(SparseFieldsMixin, FastReadMixin, UserSerializer):
     """Сериализатор для работы с информацией о пользователях."""
     is_subscribed = serializers.SerializerMethodField()
 
@@ -28,6 +135,8 @@ class UserGetSerializer(UserSerializer):
                   'last_name', 'is_subscribed')
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         return (request.user.is_authenticated
                 and Subscription.objects.filter(
@@ -35,20 +144,34 @@ class UserGetSerializer(UserSerializer):
                 ).exists())
 
 
-class RecipeSmallSerializer(serializers.ModelSerializer):
+class RecipeSmallSerializer(FastReadMixin, serializers.ModelSerializer):
     """Сериализатор для работы с краткой информацией о рецепте."""
+    image = RenditionImageField(rendition='thumbnail', read_only=True)
+
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
 
 
+class UserSubscribeListSerializer(serializers.ListSerializer):
+    """Сериализатор для списка подписок.
+    Загружает рецепты всех авторов страницы одним запросом.
+    """
+    def to_representation(self, data):
+        authors = list(data)
+        recipes = get_recent_recipes(authors,
+                                     self.context.get('recipes_limit'))
+        for author in authors:
+            author.recent_recipes = recipes[author.id]
+        return super().to_representation(authors)
+
+
 class UserSubscribeRepresentSerializer(UserGetSerializer):
     """"Сериализатор для предоставления информации
     о подписках пользователя.
     """
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -56,65 +179,84 @@ class UserSubscribeRepresentSerializer(UserGetSerializer):
                   'last_name', 'is_subscribed', 'recipes', 'recipes_count')
         read_only_fields = ('email', 'username', 'first_name', 'last_name',
                             'is_subscribed', 'recipes', 'recipes_count')
+        list_serializer_class = UserSubscribeListSerializer
 
     def get_recipes(self, obj):
         request = self.context.get('request')
-        recipes_limit = None
-        if request:
-            recipes_limit = request.query_params.get('recipes_limit')
+        if hasattr(obj, 'recent_recipes'):
+            return RecipeSmallSerializer(obj.recent_recipes, many=True,
+                                         context={'request': request}).data
+        recipes_limit = self.context.get('recipes_limit')
         recipes = obj.recipes.all()
-        if recipes_limit:
-            recipes = obj.recipes.all()[:int(recipes_limit)]
+        if recipes_limit is not None:
+            recipes = recipes[:recipes_limit]
         return RecipeSmallSerializer(recipes, many=True,
                                      context={'request': request}).data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
 
+class UniqueRelationSerializer(serializers.ModelSerializer):
+    """Базовый сериализатор для подписок, избранного и списка покупок.
+    Связь создаётся одним INSERT, повтор отсекает ограничение
+    уникальности в базе, поэтому одновременные запросы
+    не приводят к ошибке 500.
+    """
+    unique_error_message = None
 
-class UserSubscribeSerializer(serializers.ModelSerializer):
+    def create(self, validated_data):
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [self.unique_error_message]
+            })
+
+
+class UserSubscribeSerializer(UniqueRelationSerializer):
     """Сериализатор для подписки/отписки от пользователей."""
+    unique_error_message = 'Вы уже подписаны на этого пользователя'
+
     class Meta:
         model = Subscription
         fields = '__all__'
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Subscription.objects.all(),
-                fields=('user', 'author'),
-                message='Вы уже подписаны на этого пользователя'
-            )
-        ]
+        read_only_fields = ('user', 'author')
 
     def validate(self, data):
         request = self.context.get('request')
-        if request.user == data['author']:
+        if request.user == self.context.get('author'):
             raise serializers.ValidationError(
                 'Нельзя подписываться на самого себя!'
             )
         return data
 
     def to_representation(self, instance):
-        request = self.context.get('request')
         return UserSubscribeRepresentSerializer(
-            instance.author, context={'request': request}
+            instance.author, context={
+                'request': self.context.get('request'),
+                'recipes_limit': self.context.get('recipes_limit'),
+            }
         ).data
 
 
-class TagSerialiser(serializers.ModelSerializer):
+class TagSerialiser(SparseFieldsMixin, FastReadMixin,
+                    serializers.ModelSerializer):
     """Сериализатор для работы с тегами."""
     class Meta:
         model = Tag
         fields = '__all__'
+        list_serializer_class = FastReadListSerializer
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(SparseFieldsMixin, FastReadMixin,
+                           serializers.ModelSerializer):
     """Сериализатор для работы с ингредиентами."""
     class Meta:
         model = Ingredient
         fields = '__all__'
+        list_serializer_class = FastReadListSerializer
 
 
-class IngredientGetSerializer(serializers.ModelSerializer):
+class IngredientGetSerializer(FastReadMixin, serializers.ModelSerializer):
     """Сериализатор для получения информации об ингредиентах.
     Используется при работе с рецептами.
     """
@@ -142,8 +284,12 @@ class IngredientPostSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount')
 
 
-class RecipeGetSerializer(serializers.ModelSerializer):
-    """Сериализатор для получения информации о рецепте."""
+class RecipeGetSerializer(SparseFieldsMixin, FastReadMixin,
+                          serializers.ModelSerializer):
+    """Сериализатор для получения информации о рецепте.
+    ?view=card отдаёт карточку рецепта для списка.
+    """
+    views = {'card': ('id', 'name', 'image', 'author', 'cooking_time')}
     tags = TagSerialiser(many=True, read_only=True)
     author = UserGetSerializer(read_only=True)
     ingredients = IngredientGetSerializer(many=True, read_only=True,
@@ -158,7 +304,14 @@ class RecipeGetSerializer(serializers.ModelSerializer):
                   'is_favorited', 'is_in_shopping_cart', 'name',
                   'image', 'text', 'cooking_time')
 
+    def to_representation(self, instance):
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        return super().to_representation(instance)
+
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         return (request and request.user.is_authenticated
                 and Favorite.objects.filter(
@@ -166,6 +319,8 @@ class RecipeGetSerializer(serializers.ModelSerializer):
                 ).exists())
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         return (request and request.user.is_authenticated
                 and ShoppingCart.objects.filter(
@@ -198,9 +353,15 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                 )
             ingredients_list.append(ingredient.get('id'))
         if len(set(ingredients_list)) != len(ingredients_list):
+            raise serializers.ValidationError(DUPLICATE_INGREDIENT_MESSAGE)
+        existing = Ingredient.objects.in_bulk(ingredients_list)
+        missing = sorted(set(ingredients_list) - existing.keys())
+        if missing:
             raise serializers.ValidationError(
-                'Вы пытаетесь добавить в рецепт два одинаковых ингредиента'
+                f'Ингредиентов с id {missing} не существует'
             )
+        for ingredient in data.get('recipeingredients'):
+            ingredient['ingredient'] = existing[ingredient.get('id')]
         return data
 
     @transaction.atomic
@@ -211,19 +372,25 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(author=request.user, **validated_data)
         recipe.tags.set(tags)
         create_ingredients(ingredients, recipe)
+        # bulk_create и bulk_update не отправляют сигналов модели.
+        recipe_ingredient_index.changed_on_commit(recipe.id)
         return recipe
 
     @transaction.atomic
     def update(self, instance, validated_data):
         ingredients = validated_data.pop('recipeingredients')
         tags = validated_data.pop('tags')
-        instance.tags.clear()
         instance.tags.set(tags)
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        super().update(instance, validated_data)
-        create_ingredients(ingredients, instance)
-        instance.save()
-        return instance
+        changes = update_ingredients(ingredients, instance)
+        if changes:
+            ShoppingListItem.objects.apply_amounts(
+                ShoppingCart.objects.filter(
+                    recipe=instance
+                ).values_list('user', flat=True),
+                changes
+            )
+            recipe_ingredient_index.changed_on_commit(instance.id)
+        return super().update(instance, validated_data)
 
     def to_representation(self, instance):
         request = self.context.get('request')
@@ -233,18 +400,14 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         ).data
 
 
-class FavoriteSerializer(serializers.ModelSerializer):
+class FavoriteSerializer(UniqueRelationSerializer):
     """Сериализатор для работы с избранными рецептами."""
+    unique_error_message = 'Рецепт уже добавлен в избранное'
+
     class Meta:
         model = Favorite
         fields = '__all__'
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Favorite.objects.all(),
-                fields=('user', 'recipe'),
-                message='Рецепт уже добавлен в избранное'
-            )
-        ]
+        read_only_fields = ('user', 'recipe')
 
     def to_representation(self, instance):
         request = self.context.get('request')
@@ -254,18 +417,14 @@ class FavoriteSerializer(serializers.ModelSerializer):
         ).data
 
 
-class ShoppingCartSerializer(serializers.ModelSerializer):
+class ShoppingCartSerializer(UniqueRelationSerializer):
     """Сериализатор для работы со списком покупок."""
+    unique_error_message = 'Рецепт уже добавлен в список покупок'
+
     class Meta:
         model = ShoppingCart
         fields = '__all__'
-        validators = [
-            UniqueTogetherValidator(
-                queryset=ShoppingCart.objects.all(),
-                fields=('user', 'recipe'),
-                message='Рецепт уже добавлен в список покупок'
-            )
-        ]
+        read_only_fields = ('user', 'recipe')
 
     def to_representation(self, instance):
         request = self.context.get('request')
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.snapshots import update_on_commit
+from recipes.models import Ingredient, Tag
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_snapshot_changed(sender, **kwargs):
+    update_on_commit('tags')
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_snapshot_changed(sender, **kwargs):
+    update_on_commit('ingredients')
@@ -0,0 +1,169 @@
+import gzip
+import logging
+import os
+from tempfile import mkstemp
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse
+
+from api.renderers import FastJSONRenderer
+from api.serializers import IngredientSerializer, TagSerialiser
+from recipes.indexes import ingredient_index
+from recipes.models import Ingredient, Tag
+from recipes.versions import get_version
+
+logger = logging.getLogger(__name__)
+
+SAFE_NAME_CHARACTERS = set(
+    '%-_0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+)
+written_versions = {}
+
+
+def render(serializer):
+    return FastJSONRenderer().render(serializer.data)
+
+
+def get_path(name):
+    return os.path.join(settings.SNAPSHOT_ROOT, f'{name}.json')
+
+
+def get_prefix_name(prefix):
+    """Имя файла ответа автодополнения по началу названия.
+    Совпадает с тем, как браузер кодирует параметр ?name=.
+    None, если такой префикс не отдаётся из файла.
+    """
+    name = quote(prefix, safe='')
+    if set(name) - SAFE_NAME_CHARACTERS:
+        return None
+    return f'ingredients/{name}'
+
+
+def get_ingredients_name(name):
+    """Имя снимка для списка ингредиентов с параметром ?name=."""
+    if not name:
+        return 'ingredients'
+    prefix = name.casefold()
+    if len(prefix) > settings.SNAPSHOT_PREFIX_LENGTH:
+        return None
+    return get_prefix_name(prefix)
+
+
+def write_file(path, content):
+    """Атомарно записывает файл и его gzip-копию."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    for file_path, data in ((path, content),
+                            (f'{path}.gz', gzip.compress(content, mtime=0))):
+        descriptor, temp_path = mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(data)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, file_path)
+
+
+def remove_files(paths):
+    for path in paths:
+        for file_path in (path, f'{path}.gz'):
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+
+
+def build_tags():
+    return {'tags': render(TagSerialiser(Tag.objects.all(), many=True))}
+
+
+def build_ingredients():
+    """Полный список ингредиентов и ответы автодополнения
+    для всех префиксов длиной до SNAPSHOT_PREFIX_LENGTH.
+    """
+    snapshots = {'ingredients': render(
+        IngredientSerializer(Ingredient.objects.all(), many=True)
+    )}
+    keys, _ = ingredient_index.get_data()
+    prefixes = {
+        key[:length] for key in keys
+        for length in range(1, settings.SNAPSHOT_PREFIX_LENGTH + 1)
+        if len(key) >= length
+    }
+    for prefix in prefixes:
+        name = get_prefix_name(prefix)
+        if name is not None:
+            snapshots[name] = render(IngredientSerializer(
+                ingredient_index.search(
+                    prefix, settings.INGREDIENT_SEARCH_LIMIT
+                ),
+                many=True
+            ))
+    return snapshots
+
+
+SNAPSHOTS = {
+    'tags': build_tags,
+    'ingredients': build_ingredients,
+}
+
+
+def get_written_paths(kind):
+    if kind != 'ingredients':
+        return {get_path(kind)}
+    directory = os.path.join(settings.SNAPSHOT_ROOT, 'ingredients')
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        names = []
+    return {get_path(kind)} | {
+        os.path.join(directory, name) for name in names
+        if name.endswith('.json')
+    }
+
+
+def write_snapshots(kind):
+    """Перезаписывает файлы снимка и удаляет устаревшие."""
+    snapshots = SNAPSHOTS[kind]()
+    paths = set()
+    for name, content in snapshots.items():
+        path = get_path(name)
+        write_file(path, content)
+        paths.add(path)
+    remove_files(get_written_paths(kind) - paths)
+
+
+def update_snapshots(kind):
+    """Обновляет снимок, если данные изменились с последней записи.
+    При ошибке записи снимок удаляется, и ответы снова
+    формирует приложение.
+    """
+    version = get_version(kind)
+    if written_versions.get(kind) == version:
+        return
+    try:
+        write_snapshots(kind)
+    except OSError:
+        logger.exception('Не удалось записать снимок %s', kind)
+        remove_files(get_written_paths(kind))
+        return
+    written_versions[kind] = version
+
+
+def update_on_commit(*kinds):
+    """Обновляет снимки после фиксации транзакции."""
+    def update():
+        for kind in kinds:
+            update_snapshots(kind)
+    transaction.on_commit(update)
+
+
+def snapshot_response(request, name):
+    """Ответ из файла снимка, если он есть. Только для JSON-ответов."""
+    if name is None or request.accepted_renderer.format != 'json':
+        return None
+    try:
+        with open(get_path(name), 'rb') as file:
+            return HttpResponse(file.read(), content_type='application/json')
+    except FileNotFoundError:
+        return None
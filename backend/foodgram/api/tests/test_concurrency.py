@@ -0,0 +1,78 @@
+import threading
+from unittest import skipUnless
+
+from django.db import connection
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.tests.base import CacheTransactionTestCase
+from users.models import Subscription, User
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            'Параллельные транзакции нужны PostgreSQL')
+class DoubleSubmitTest(CacheTransactionTestCase):
+    """Два одновременных одинаковых запроса из разных потоков:
+    один выполняется, второй получает 400, счётчики не расходятся.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user, self.author = [
+            User.objects.create(username=username,
+                                email=f'{username}@example.com',
+                                first_name='Имя', last_name='Фамилия')
+            for username in ('reader', 'author')
+        ]
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Рецепт', text='текст', cooking_time=10
+        )
+
+    def submit_twice(self, method, url):
+        barrier = threading.Barrier(2)
+        status_codes = []
+
+        def submit():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                barrier.wait()
+                status_codes.append(getattr(client, method)(url).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sorted(status_codes)
+
+    def assertCounter(self, instance, counter, value):
+        instance.refresh_from_db()
+        self.assertEqual(getattr(instance, counter), value)
+
+    def test_recipe_relations(self):
+        for model, url, counter in (
+            (Favorite, f'/api/recipes/{self.recipe.id}/favorite/',
+             'favorites_count'),
+            (ShoppingCart, f'/api/recipes/{self.recipe.id}/shopping_cart/',
+             'carts_count'),
+        ):
+            with self.subTest(model=model.__name__):
+                self.assertEqual(self.submit_twice('post', url), [201, 400])
+                self.assertEqual(model.objects.count(), 1)
+                self.assertCounter(self.recipe, counter, 1)
+                self.assertEqual(self.submit_twice('delete', url),
+                                 [204, 400])
+                self.assertFalse(model.objects.exists())
+                self.assertCounter(self.recipe, counter, 0)
+
+    def test_subscription(self):
+        url = f'/api/users/{self.author.id}/subscribe/'
+        self.assertEqual(self.submit_twice('post', url), [201, 400])
+        self.assertEqual(Subscription.objects.count(), 1)
+        self.assertCounter(self.author, 'followers_count', 1)
+        self.assertEqual(self.submit_twice('delete', url), [204, 400])
+        self.assertFalse(Subscription.objects.exists())
+        self.assertCounter(self.author, 'followers_count', 0)
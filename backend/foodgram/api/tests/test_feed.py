@@ -0,0 +1,109 @@
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import FeedInbox, FeedItem, Recipe
+from recipes.tests.base import CacheTestCase
+from users.models import Subscription, User
+
+
+class FeedPaginationTest(CacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author = [
+            User.objects.create(username=username,
+                                email=f'{username}@example.com',
+                                first_name='Имя', last_name='Фамилия')
+            for username in ('reader', 'author')
+        ]
+        Subscription.objects.create(user=cls.user, author=cls.author)
+        cls.recipe_ids = sorted((
+            Recipe.objects.create(
+                author=cls.author, name=f'Рецепт {number}', text='текст',
+                cooking_time=10
+            ).id
+            for number in range(3)
+        ), reverse=True)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_ids(self, response):
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_before(self):
+        response = self.client.get('/api/recipes/feed/?limit=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_ids(response), self.recipe_ids[:2])
+        response = self.client.get(
+            f'/api/recipes/feed/?limit=2&before={self.recipe_ids[1]}'
+        )
+        self.assertEqual(self.get_ids(response), self.recipe_ids[2:])
+
+    def test_malformed_before(self):
+        response = self.client.get('/api/recipes/feed/?before=abc')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('before', response.data)
+
+
+@override_settings(FEED_INBOX_MIN_SUBSCRIPTIONS=2)
+class FeedInboxTest(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, *self.authors = [
+            User.objects.create(username=username,
+                                email=f'{username}@example.com',
+                                first_name='Имя', last_name='Фамилия')
+            for username in ('reader', 'first', 'second', 'third')
+        ]
+        for author in self.authors[:2]:
+            Subscription.objects.create(user=self.user, author=author)
+            self.create_recipe(author)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, author):
+        return Recipe.objects.create(author=author, name='Рецепт',
+                                     text='текст', cooking_time=10)
+
+    def get_feed_ids(self):
+        response = self.client.get('/api/recipes/feed/')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def get_recipe_ids(self):
+        return list(Recipe.objects.filter(
+            author__following__user=self.user
+        ).order_by('-id').values_list('id', flat=True))
+
+    def test_inbox_built(self):
+        self.assertFalse(FeedInbox.objects.filter(user=self.user).exists())
+        self.assertEqual(self.get_feed_ids(), self.get_recipe_ids())
+        self.assertTrue(FeedInbox.objects.filter(user=self.user).exists())
+        self.assertEqual(
+            FeedItem.objects.filter(user=self.user).count(), 2
+        )
+
+    def test_recipe_pushed_after_commit(self):
+        self.get_feed_ids()
+        with self.captureOnCommitCallbacks() as callbacks:
+            recipe = self.create_recipe(self.authors[0])
+        self.assertFalse(FeedItem.objects.filter(recipe=recipe).exists())
+        for callback in callbacks:
+            callback()
+        self.assertTrue(
+            FeedItem.objects.filter(user=self.user, recipe=recipe).exists()
+        )
+        self.assertEqual(self.get_feed_ids()[0], recipe.id)
+
+    def test_subscriptions_changed(self):
+        self.get_feed_ids()
+        self.create_recipe(self.authors[2])
+        Subscription.objects.create(user=self.user, author=self.authors[2])
+        self.assertEqual(self.get_feed_ids(), self.get_recipe_ids())
+        Subscription.objects.filter(
+            user=self.user, author=self.authors[0]
+        ).delete()
+        self.assertEqual(self.get_feed_ids(), self.get_recipe_ids())
+        self.assertEqual(len(self.get_feed_ids()), 2)
@@ -0,0 +1,231 @@
+import base64
+import os
+import shutil
+import struct
+import tempfile
+import tracemalloc
+import zlib
+from io import BytesIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+from rest_framework.serializers import ValidationError
+
+from api.utils import (BASE64_CHUNK_SIZE, IMAGE_MEMORY_SIZE,
+                       Base64ImageField, decode_base64_image)
+from recipes.images import create_renditions, get_rendition_url
+from recipes.models import Recipe
+from recipes.tests.base import CacheTestCase
+from users.models import User
+
+
+def make_image(image_format, size=(320, 240)):
+    """Изображение из случайных пикселей, которое почти не сжимается."""
+    image = Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3))
+    buffer = BytesIO()
+    image.save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def make_blank_png(width, height):
+    """PNG из чёрных пикселей: файл маленький, а изображение большое."""
+    compressor = zlib.compressobj()
+    row = bytes(width * 3 + 1)
+    data = b''.join(
+        compressor.compress(row) for _ in range(height)
+    ) + compressor.flush()
+
+    def chunk(kind, body):
+        return (struct.pack('>I', len(body)) + kind + body
+                + struct.pack('>I', zlib.crc32(kind + body)))
+    return b''.join((
+        b'\x89PNG\r\n\x1a\n',
+        chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)),
+        chunk(b'IDAT', data),
+        chunk(b'IEND', b''),
+    ))
+
+
+def make_data_uri(content, mime_type):
+    return f'data:{mime_type};base64,{base64.b64encode(content).decode()}'
+
+
+class DecodeBase64ImageTest(SimpleTestCase):
+    def test_valid_image(self):
+        for image_format, mime_type in (('JPEG', 'image/jpeg'),
+                                        ('PNG', 'image/png')):
+            content = make_image(image_format)
+            with self.subTest(image_format=image_format):
+                file = decode_base64_image(make_data_uri(content, mime_type))
+                self.assertEqual(file.read(), content)
+                file.close()
+
+    def test_pixel_limit(self):
+        data = make_data_uri(make_image('PNG', (320, 240)), 'image/png')
+        with override_settings(RECIPE_IMAGE_MAX_PIXELS=320 * 240):
+            decode_base64_image(data).close()
+        with override_settings(RECIPE_IMAGE_MAX_PIXELS=320 * 240 - 1):
+            with self.assertRaises(ValidationError):
+                decode_base64_image(data)
+
+    def test_large_image_rejected_before_decoding(self):
+        """9000x9000 пикселей - около 250 КБ в PNG и 243 МБ
+        после декодирования.
+        """
+        content = make_blank_png(9000, 9000)
+        self.assertLess(len(content), 1024 * 1024)
+        with self.assertRaisesMessage(ValidationError, 'млн пикселей'):
+            decode_base64_image(make_data_uri(content, 'image/png'))
+
+    def test_truncated_image_rejected(self):
+        for image_format, mime_type in (('JPEG', 'image/jpeg'),
+                                        ('PNG', 'image/png')):
+            content = make_image(image_format)
+            with self.subTest(image_format=image_format):
+                with self.assertRaises(ValidationError):
+                    decode_base64_image(make_data_uri(
+                        content[:len(content) // 2], mime_type
+                    ))
+
+
+class DecodeBase64ImageMemoryTest(SimpleTestCase):
+    """Пиковая память декодирования не зависит от размера файла.
+    tracemalloc видит декодированные из base64 данные, но не буферы
+    пикселей Pillow: их размер ограничивает RECIPE_IMAGE_MAX_PIXELS.
+    """
+    memory_limit = IMAGE_MEMORY_SIZE + 8 * BASE64_CHUNK_SIZE
+
+    def get_peak(self, data):
+        tracemalloc.start()
+        try:
+            file = decode_base64_image(data)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        file.close()
+        return peak
+
+    def test_peak_memory(self):
+        for image_format, mime_type, size in (
+            ('JPEG', 'image/jpeg', (2400, 1800)),
+            ('PNG', 'image/png', (1100, 1100)),
+        ):
+            content = make_image(image_format, size)
+            self.assertGreater(len(content), self.memory_limit)
+            with self.subTest(image_format=image_format):
+                self.assertLess(
+                    self.get_peak(make_data_uri(content, mime_type)),
+                    self.memory_limit
+                )
+
+    def test_rejected_image_peak_memory(self):
+        content = make_image('PNG', (1100, 1100))
+        data = make_data_uri(content[:len(content) // 2], 'image/png')
+        tracemalloc.start()
+        try:
+            with self.assertRaises(ValidationError):
+                decode_base64_image(data)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, self.memory_limit)
+
+
+class Base64ImageFieldTest(SimpleTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.field = Base64ImageField()
+        self.content = make_image('PNG')
+
+    def save(self, image):
+        name = default_storage.save(
+            Recipe._meta.get_field('image').generate_filename(
+                None, image.name
+            ),
+            image
+        )
+        image.close()
+        return name
+
+    def test_same_base64_image_stored_once(self):
+        data = make_data_uri(self.content, 'image/png')
+        name = self.save(self.field.to_internal_value(data))
+        self.assertEqual(self.field.to_internal_value(data), name)
+
+    def test_upload_does_not_reuse_stored_image(self):
+        name = self.save(self.field.to_internal_value(
+            make_data_uri(self.content, 'image/png')
+        ))
+        upload = self.field.to_internal_value(SimpleUploadedFile(
+            os.path.basename(name), make_image('PNG'), 'image/png'
+        ))
+        self.assertNotIsInstance(upload, str)
+        self.assertNotEqual(self.save(upload), name)
+        with default_storage.open(name) as file:
+            self.assertEqual(file.read(), self.content)
+
+    def test_upload_cannot_take_hashed_name(self):
+        name = self.field.to_internal_value(
+            make_data_uri(self.content, 'image/png')
+        ).name
+        upload = self.field.to_internal_value(SimpleUploadedFile(
+            name, make_image('PNG'), 'image/png'
+        ))
+        self.assertNotEqual(self.save(upload), self.save(
+            self.field.to_internal_value(
+                make_data_uri(self.content, 'image/png')
+            )
+        ))
+
+
+class RenditionTest(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.name = default_storage.save('recipes/image.png',
+                                         ContentFile(make_image('PNG')))
+        author = User.objects.create(username='author',
+                                     email='author@example.com')
+        self.recipes = [
+            Recipe.objects.create(author=author, name=f'Рецепт {number}',
+                                  text='текст', cooking_time=10,
+                                  image=self.name)
+            for number in range(2)
+        ]
+
+    def get_url(self, recipe):
+        with mock.patch.object(default_storage, 'exists') as exists:
+            url = get_rendition_url(recipe.image, 'thumbnail')
+        exists.assert_not_called()
+        return url
+
+    def test_url_after_renditions_created(self):
+        self.assertEqual(self.get_url(self.recipes[0]),
+                         self.recipes[0].image.url)
+        create_renditions(self.name)
+        for recipe in self.recipes:
+            recipe.refresh_from_db()
+            self.assertEqual(recipe.rendition_image, self.name)
+            self.assertEqual(self.get_url(recipe),
+                             '/media/recipes/renditions/image_thumbnail.webp')
+
+    def test_new_image_uses_original(self):
+        create_renditions(self.name)
+        recipe = self.recipes[0]
+        recipe.refresh_from_db()
+        recipe.image = default_storage.save('recipes/other.png',
+                                            ContentFile(make_image('PNG')))
+        recipe.save()
+        self.assertEqual(self.get_url(recipe), recipe.image.url)
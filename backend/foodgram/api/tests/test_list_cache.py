@@ -0,0 +1,42 @@
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.tests.base import CacheTestCase
+from users.models import User
+
+
+class RecipeListCacheTest(CacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            username='reader', email='reader@example.com',
+            first_name='Читатель', last_name='Читателев'
+        )
+        cls.first, cls.second = [
+            Recipe.objects.create(author=cls.user, name=f'Рецепт {number}',
+                                  text='текст', cooking_time=10)
+            for number in range(2)
+        ]
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return ([recipe['id'] for recipe in response.data['results']],
+                response['X-Cache'])
+
+    def test_counter_ordering(self):
+        for model, ordering in ((Favorite, '-favorites_count'),
+                                (ShoppingCart, '-carts_count,-id')):
+            url = f'/api/recipes/?ordering={ordering}'
+            self.get(url)
+            self.get('/api/recipes/')
+            with self.captureOnCommitCallbacks(execute=True):
+                model.objects.create(user=self.user, recipe=self.first)
+            ids, cache_status = self.get(url)
+            self.assertEqual(cache_status, 'MISS')
+            self.assertEqual(ids[0], self.first.id)
+            self.assertEqual(self.get('/api/recipes/')[1], 'HIT')
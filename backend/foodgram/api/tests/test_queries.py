@@ -0,0 +1,112 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from recipes.tests.base import CacheTestCase
+from users.models import Subscription, User
+
+RECIPES_COUNT = 12
+
+
+class RecipeQueriesTest(CacheTestCase):
+    """Число запросов к базе при чтении рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = [
+            User.objects.create(
+                username=f'author{number}',
+                email=f'author{number}@example.com',
+                first_name='Автор', last_name=str(number)
+            )
+            for number in range(3)
+        ]
+        cls.user = User.objects.create(
+            username='reader', email='reader@example.com',
+            first_name='Читатель', last_name='Читателев'
+        )
+        tags = [
+            Tag.objects.create(name=f'Тег {number}', color=f'#00000{number}',
+                               slug=f'tag{number}')
+            for number in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(name=f'ингредиент {number}',
+                                      measurement_unit='г')
+            for number in range(5)
+        ]
+        for number in range(RECIPES_COUNT):
+            recipe = Recipe.objects.create(
+                author=cls.authors[number % len(cls.authors)],
+                name=f'Рецепт {number}', text='текст', cooking_time=10,
+                image='recipes/image.png'
+            )
+            recipe.tags.set(tags[:number % len(tags) + 1])
+            RecipeIngredient.objects.bulk_create([
+                RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                                 amount=number + 1)
+                for ingredient in ingredients[:number % 4 + 2]
+            ])
+            if number % 2:
+                Favorite.objects.create(user=cls.user, recipe=recipe)
+            if number % 3:
+                ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        Subscription.objects.create(user=cls.user, author=cls.authors[0])
+        cls.recipe = Recipe.objects.order_by('id').first()
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user_client = APIClient()
+        self.user_client.force_authenticate(self.user)
+
+    def count_queries(self, client, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_list_queries_do_not_depend_on_page_size(self):
+        urls = (
+            '/api/recipes/?limit={}',
+            '/api/recipes/?limit={}&cursor=',
+            '/api/recipes/?limit={}&tags=tag0&tags=tag1',
+            '/api/recipes/?limit={}&is_favorited=1&is_in_shopping_cart=1',
+        )
+        for client in (self.client, self.user_client):
+            for url in urls:
+                with self.subTest(url=url):
+                    self.assertEqual(
+                        self.count_queries(client, url.format(1)),
+                        self.count_queries(client, url.format(RECIPES_COUNT))
+                    )
+
+    def test_list_query_budget(self):
+        for client in (self.client, self.user_client):
+            cache.clear()
+            with self.assertNumQueries(4):
+                client.get('/api/recipes/')
+            cache.clear()
+            with self.assertNumQueries(3):
+                client.get('/api/recipes/?cursor=')
+
+    def test_retrieve_query_budget(self):
+        for client in (self.client, self.user_client):
+            cache.clear()
+            with self.assertNumQueries(4):
+                client.get(f'/api/recipes/{self.recipe.id}/')
+
+    def test_cached_response_query_budget(self):
+        """Из кэша список отдаётся без запросов, а рецепт - с одним
+        запросом времени изменения для ETag и Last-Modified.
+        """
+        for url, budget in (('/api/recipes/', 0),
+                            (f'/api/recipes/{self.recipe.id}/', 1)):
+            self.client.get(url)
+            with self.assertNumQueries(budget):
+                response = self.client.get(url)
+            self.assertEqual(response['X-Cache'], 'HIT')
@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+
+from django.test import override_settings
+from rest_framework import serializers
+from rest_framework.test import APIClient
+
+from api.tests.test_images import make_data_uri, make_image
+from api.utils import DUPLICATE_INGREDIENT_MESSAGE, create_ingredients
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.tests.base import CacheTestCase
+from users.models import User
+
+
+class DuplicateIngredientTest(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create(
+            username='cook', email='cook@example.com',
+            first_name='Повар', last_name='Поваров'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(name='Ужин', color='#000000',
+                                      slug='dinner')
+        self.ingredient = Ingredient.objects.create(name='соль',
+                                                    measurement_unit='г')
+
+    def get_stored_files(self):
+        return [
+            name for _, _, names in os.walk(self.media_root)
+            for name in names
+        ]
+
+    def test_duplicate_rejected_before_image_is_stored(self):
+        response = self.client.post('/api/recipes/', {
+            'ingredients': [{'id': self.ingredient.id, 'amount': 1},
+                            {'id': self.ingredient.id, 'amount': 2}],
+            'tags': [self.tag.id],
+            'image': make_data_uri(make_image('PNG'), 'image/png'),
+            'name': 'Рецепт',
+            'text': 'текст',
+            'cooking_time': 10,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {
+            'non_field_errors': [DUPLICATE_INGREDIENT_MESSAGE]
+        })
+        self.assertFalse(Recipe.objects.exists())
+        self.assertEqual(self.get_stored_files(), [])
+
+    def test_database_constraint_error(self):
+        recipe = Recipe.objects.create(
+            author=self.user, name='Рецепт', text='текст', cooking_time=10,
+            image='recipes/image.png'
+        )
+        ingredient = {'ingredient': self.ingredient, 'amount': 1}
+        create_ingredients([ingredient], recipe)
+        with self.assertRaises(serializers.ValidationError) as context:
+            create_ingredients([ingredient], recipe)
+        self.assertEqual(context.exception.detail, {
+            'non_field_errors': [DUPLICATE_INGREDIENT_MESSAGE]
+        })
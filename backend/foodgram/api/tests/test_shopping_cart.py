@@ -0,0 +1,56 @@
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from recipes.tests.base import CacheTestCase
+from users.models import User
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+class DownloadShoppingCartTest(CacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            username='cook', email='cook@example.com',
+            first_name='Повар', last_name='Поваров'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.user, name='Рецепт', text='текст', cooking_time=10
+        )
+        RecipeIngredient.objects.create(
+            recipe=cls.recipe, amount=200,
+            ingredient=Ingredient.objects.create(name='мука',
+                                                 measurement_unit='г')
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.client.post(f'/api/recipes/{self.recipe.id}/shopping_cart/')
+
+    def download(self, url=URL, **headers):
+        response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_text_by_default(self):
+        for accept in (None, '*/*', 'application/json', 'text/html'):
+            headers = {'HTTP_ACCEPT': accept} if accept else {}
+            with self.subTest(accept=accept):
+                response, content = self.download(**headers)
+                self.assertEqual(response['Content-Type'],
+                                 'text/plain; charset=utf-8')
+                self.assertEqual(content.decode(),
+                                 'Список покупок:\n\nмука - 200, г')
+
+    def test_formats(self):
+        response, content = self.download(HTTP_ACCEPT='text/csv')
+        self.assertEqual(content.decode().splitlines()[1], 'мука,г,200')
+        response, content = self.download(f'{URL}?format=pdf')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(content.startswith(b'%PDF'))
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get(f'{URL}?format=xls').status_code,
+                         404)
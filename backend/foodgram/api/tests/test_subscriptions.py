@@ -0,0 +1,56 @@
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from recipes.tests.base import CacheTestCase
+from users.models import Subscription, User
+
+
+class RecipesLimitTest(CacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author, cls.other = [
+            User.objects.create(username=username,
+                                email=f'{username}@example.com',
+                                first_name='Имя', last_name='Фамилия')
+            for username in ('reader', 'author', 'other')
+        ]
+        Subscription.objects.create(user=cls.user, author=cls.author)
+        for author in (cls.author, cls.other):
+            for number in range(3):
+                Recipe.objects.create(author=author, name=f'Рецепт {number}',
+                                      text='текст', cooking_time=10)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_limit(self):
+        for recipes_limit, count in (('', 3), ('0', 0), ('2', 2)):
+            response = self.client.get(
+                f'/api/users/subscriptions/?recipes_limit={recipes_limit}'
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                len(response.data['results'][0]['recipes']), count
+            )
+        response = self.client.post(
+            f'/api/users/{self.other.id}/subscribe/?recipes_limit=1'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['recipes']), 1)
+
+    def test_malformed_limit(self):
+        for recipes_limit in ('abc', '-1', '1.5'):
+            response = self.client.get(
+                f'/api/users/subscriptions/?recipes_limit={recipes_limit}'
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('recipes_limit', response.data)
+        response = self.client.post(
+            f'/api/users/{self.other.id}/subscribe/?recipes_limit=abc'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Subscription.objects.filter(
+            user=self.user, author=self.other
+        ).exists())
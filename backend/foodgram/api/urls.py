@@ -2,7 +2,8 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from api.views import (IngredientViewSet, RecipeViewSet, TagViewSet,
-                       UserSubscribeView, UserSubscriptionsViewSet)
+                       UserSubscribeView, UserSubscriptionsViewSet,
+                       UserViewSet)
 
 
 v1_router = DefaultRouter()
@@ -10,6 +11,7 @@ v1_router = DefaultRouter()
 v1_router.register(r'tags', TagViewSet, basename='tags')
 v1_router.register(r'ingredients', IngredientViewSet, basename='ingredients')
 v1_router.register(r'recipes', RecipeViewSet, basename='recipes')
+v1_router.register(r'users', UserViewSet, basename='users')
 
 
 urlpatterns = [
@@ -17,6 +19,5 @@ urlpatterns = [
          UserSubscriptionsViewSet.as_view({'get': 'list'})),
     path('users/<int:user_id>/subscribe/', UserSubscribeView.as_view()),
     path('', include(v1_router.urls)),
-    path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
@@ -1,59 +1,284 @@
 import base64
+import posixpath
+from collections import defaultdict
+from hashlib import sha256
+from tempfile import SpooledTemporaryFile
 
-from django.shortcuts import get_object_or_404
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from PIL import Image
 from rest_framework import serializers, status
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
-from recipes.models import Ingredient, RecipeIngredient
+from recipes.images import get_rendition_url
+from recipes.models import Recipe, RecipeIngredient
 
+IMAGE_FORMATS = {
+    'image/jpeg': 'jpeg',
+    'image/jpg': 'jpeg',
+    'image/png': 'png',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+}
+BASE64_HEADER_LENGTH = 64
+BASE64_CHUNK_SIZE = 64 * 1024
+IMAGE_MEMORY_SIZE = 1024 * 1024
+HASHED_IMAGE_DIRECTORY = 'sha256'
+DUPLICATE_INGREDIENT_MESSAGE = (
+    'Вы пытаетесь добавить в рецепт два одинаковых ингредиента'
+)
 
-class Base64ImageField(serializers.ImageField):
-    """Вспомогательный класс для работы с изображениями."""
+
+class RenditionImageField(serializers.ImageField):
+    """Изображение со ссылкой на уменьшенную копию.
+    Размер копии задаётся параметром image_rendition
+    в контексте сериализатора.
+    """
+    def __init__(self, rendition=None, **kwargs):
+        self.rendition = rendition
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        rendition = self.context.get('image_rendition', self.rendition)
+        if not value or not rendition:
+            return super().to_representation(value)
+        url = get_rendition_url(value, rendition)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
+def decode_base64_image(data):
+    """Вспомогательная функция для декодирования изображения из data URI.
+    Размер файла и число пикселей проверяются до декодирования,
+    само декодирование идёт частями во временный файл, который
+    при большом размере сбрасывается на диск.
+    """
+    header, separator, _ = data[:BASE64_HEADER_LENGTH].partition(';base64,')
+    ext = IMAGE_FORMATS.get(header[len('data:'):])
+    if not separator or ext is None:
+        raise serializers.ValidationError('Неподдерживаемый тип изображения')
+    start = len(header) + len(separator)
+    padding = data[-2:].count('=')
+    size = (len(data) - start) * 3 // 4 - padding
+    if size > settings.RECIPE_IMAGE_MAX_SIZE:
+        raise serializers.ValidationError(
+            'Размер изображения не должен превышать '
+            f'{settings.RECIPE_IMAGE_MAX_SIZE // 1024 // 1024} МБ'
+        )
+    file = SpooledTemporaryFile(max_size=IMAGE_MEMORY_SIZE)
+    digest = sha256()
+    try:
+        for offset in range(start, len(data), BASE64_CHUNK_SIZE):
+            chunk = base64.b64decode(
+                data[offset:offset + BASE64_CHUNK_SIZE], validate=True
+            )
+            digest.update(chunk)
+            file.write(chunk)
+        file.seek(0)
+        with Image.open(file) as image:
+            if image.format.lower() not in IMAGE_FORMATS.values():
+                raise serializers.ValidationError(
+                    'Неподдерживаемый тип изображения'
+                )
+            if image.width * image.height > settings.RECIPE_IMAGE_MAX_PIXELS:
+                raise serializers.ValidationError(
+                    'Изображение не должно превышать '
+                    f'{settings.RECIPE_IMAGE_MAX_PIXELS // 1000 // 1000} '
+                    'млн пикселей'
+                )
+            image.verify()
+        # verify() не декодирует данные и пропускает обрезанные файлы.
+        # JPEG декодируется в уменьшенном виде, остальные форматы
+        # целиком, но их размер ограничен RECIPE_IMAGE_MAX_PIXELS.
+        file.seek(0)
+        with Image.open(file) as image:
+            image.draft(image.mode, (image.width // 8, image.height // 8))
+            image.load()
+    except (ValueError, OSError, SyntaxError,
+            Image.DecompressionBombError):
+        file.close()
+        raise serializers.ValidationError('Загруженный файл не является '
+                                          'корректным изображением')
+    except serializers.ValidationError:
+        file.close()
+        raise
+    file.seek(0)
+    return File(file, name=f'{digest.hexdigest()}.{ext}')
+
+
+class Base64ImageField(RenditionImageField):
+    """Вспомогательный класс для работы с изображениями.
+    Изображения из data URI именуются по хэшу содержимого
+    в отдельном каталоге, поэтому одинаковые хранятся
+    в единственном экземпляре. Имена загруженных файлов
+    не содержат каталогов и не могут занять эти имена.
+    """
     def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+        if not isinstance(data, str) or not data.startswith('data:'):
+            return super().to_internal_value(data)
+        image = serializers.FileField.to_internal_value(
+            self, decode_base64_image(data)
+        )
+        image.name = posixpath.join(HASHED_IMAGE_DIRECTORY, image.name)
+        name = Recipe._meta.get_field('image').generate_filename(
+            None, image.name
+        )
+        if default_storage.exists(name):
+            image.close()
+            return name
+        return image
+
 
-        return super().to_internal_value(data)
+def duplicate_ingredient_error():
+    return serializers.ValidationError(
+        {api_settings.NON_FIELD_ERRORS_KEY: [DUPLICATE_INGREDIENT_MESSAGE]}
+    )
 
 
 def create_ingredients(ingredients, recipe):
-    """Вспомогательная функция для добавления ингредиентов."""
-    ingredient_list = []
-    for ingredient in ingredients:
-        current_ingredient = get_object_or_404(Ingredient,
-                                               id=ingredient.get('id'))
-        amount = ingredient.get('amount')
-        ingredient_list.append(
-            RecipeIngredient(
-                recipe=recipe,
-                ingredient=current_ingredient,
-                amount=amount
+    """Вспомогательная функция для добавления ингредиентов.
+    Повторы отсекает validate() сериализатора, ограничение
+    уникальности в базе остаётся страховкой от гонок.
+    """
+    try:
+        with transaction.atomic():
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredient=ingredient.get('ingredient'),
+                    amount=ingredient.get('amount')
+                )
+                for ingredient in ingredients
             )
+    except IntegrityError:
+        raise duplicate_ingredient_error()
+
+
+def update_ingredients(ingredients, recipe):
+    """Вспомогательная функция для обновления ингредиентов рецепта.
+    Изменяет только отличающиеся записи и возвращает
+    изменение количества по каждому ингредиенту.
+    """
+    current = {
+        recipe_ingredient.ingredient_id: recipe_ingredient
+        for recipe_ingredient in RecipeIngredient.objects.filter(
+            recipe=recipe
+        )
+    }
+    new = {
+        ingredient.get('ingredient').id: ingredient.get('amount')
+        for ingredient in ingredients
+    }
+    if len(new) != len(ingredients):
+        raise duplicate_ingredient_error()
+    changes = {}
+    to_update = []
+    to_delete = []
+    for ingredient_id, recipe_ingredient in current.items():
+        amount = new.get(ingredient_id)
+        if amount is None:
+            to_delete.append(recipe_ingredient.id)
+            changes[ingredient_id] = -recipe_ingredient.amount
+        elif amount != recipe_ingredient.amount:
+            changes[ingredient_id] = amount - recipe_ingredient.amount
+            recipe_ingredient.amount = amount
+            to_update.append(recipe_ingredient)
+    to_create = [
+        ingredient for ingredient in ingredients
+        if ingredient.get('ingredient').id not in current
+    ]
+    for ingredient in to_create:
+        changes[ingredient.get('ingredient').id] = ingredient.get('amount')
+    if to_delete:
+        RecipeIngredient.objects.filter(id__in=to_delete).delete()
+    if to_update:
+        RecipeIngredient.objects.bulk_update(to_update, ['amount'])
+    if to_create:
+        create_ingredients(to_create, recipe)
+    return changes
+
+
+def get_recent_recipes(authors, recipes_limit=None):
+    """Вспомогательная функция для получения последних рецептов
+    нескольких авторов одним запросом.
+    """
+    recipes = Recipe.objects.filter(author__in=authors)
+    if recipes_limit is not None:
+        ranked = recipes.annotate(recipe_rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('author')],
+            order_by=F('id').desc(),
+        ))
+        sql, params = ranked.query.sql_with_params()
+        recipes = Recipe.objects.raw(
+            f'SELECT * FROM ({sql}) ranked '
+            f'WHERE ranked.recipe_rank <= %s ORDER BY ranked.id DESC',
+            (*params, recipes_limit)
+        )
+    recipes_by_author = defaultdict(list)
+    for recipe in recipes:
+        recipes_by_author[recipe.author_id].append(recipe)
+    return recipes_by_author
+
+
+def get_recipes_limit(request):
+    """Параметр recipes_limit: неотрицательное число или None."""
+    recipes_limit = request.query_params.get('recipes_limit')
+    if not recipes_limit:
+        return None
+    if not recipes_limit.isdecimal():
+        raise serializers.ValidationError(
+            {'recipes_limit': ['Некорректный параметр recipes_limit']}
         )
-    RecipeIngredient.objects.bulk_create(ingredient_list)
+    return int(recipes_limit)
+
+
+def get_query_list(request, name):
+    """Значения параметра запроса через запятую: ?fields=id,name."""
+    return {
+        value.strip()
+        for param in request.query_params.getlist(name)
+        for value in param.split(',') if value.strip()
+    }
 
 
 def create_model_instance(request, instance, serializer_name):
     """Вспомогательная функция для добавления
     рецепта в избранное либо список покупок.
     """
-    serializer = serializer_name(
-        data={'user': request.user.id, 'recipe': instance.id, },
-        context={'request': request}
-    )
+    serializer = serializer_name(data={}, context={'request': request})
     serializer.is_valid(raise_exception=True)
-    serializer.save()
+    with transaction.atomic():
+        serializer.save(user=request.user, recipe=instance)
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+def delete_locked(queryset):
+    """Удаляет объекты, предварительно заблокировав их строки.
+    Параллельный запрос дождётся блокировки и ничего не найдёт,
+    поэтому сигналы удаления срабатывают ровно один раз.
+    Возвращает количество удалённых объектов.
+    """
+    with transaction.atomic():
+        pks = list(queryset.select_for_update().values_list('pk', flat=True))
+        if not pks:
+            return 0
+        return queryset.model.objects.filter(pk__in=pks).delete()[0]
+
+
 def delete_model_instance(request, model_name, instance, error_message):
     """Вспомогательная функция для удаления рецепта."""
-    if not model_name.objects.filter(user=request.user,
-                                     recipe=instance).exists():
+    deleted = delete_locked(model_name.objects.filter(
+        user=request.user, recipe=instance
+    ))
+    if not deleted:
         return Response({'errors': error_message},
                         status=status.HTTP_400_BAD_REQUEST)
-    model_name.objects.filter(user=request.user, recipe=instance).delete()
     return Response(status=status.HTTP_204_NO_CONTENT)
@@ -1,60 +1,126 @@
-from django.db.models import Sum
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BooleanField, Exists, F, OuterRef, Value
 from django_filters.rest_framework import DjangoFilterBackend
-from django.shortcuts import HttpResponse, get_object_or_404
+from djoser.views import UserViewSet as DjoserUserViewSet
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from api.filters import IngredientFilter, RecipeFilter
+from api.cache import (cached_response, get_detail_key, get_list_key,
+                       idempotent, ingredients_etag,
+                       ingredients_last_modified, recipe_etag,
+                       recipe_last_modified, tags_etag, tags_last_modified)
+from api.filters import IngredientFilter, RecipeFilter, RecipeOrderingFilter
+from api.negotiation import FallbackContentNegotiation
+from api.pagination import (PageLimitPagination, RecipeFeedPagination,
+                            RecipePagination)
 from api.permissions import IsAdminAuthorOrReadOnly
+from api.renderers import (ShoppingCartCSVRenderer, ShoppingCartPDFRenderer,
+                           ShoppingCartTextRenderer)
 from api.serializers import (FavoriteSerializer, IngredientSerializer,
                              RecipeCreateSerializer,
                              RecipeGetSerializer, ShoppingCartSerializer,
                              TagSerialiser,
                              UserSubscribeRepresentSerializer,
                              UserSubscribeSerializer)
-from api.utils import create_model_instance, delete_model_instance
+from api.snapshots import get_ingredients_name, snapshot_response
+from api.utils import (create_model_instance, delete_locked,
+                       delete_model_instance, get_recipes_limit)
+from recipes.feed import get_feed
+from recipes.indexes import ingredient_index, recipe_ingredient_index
 from recipes.models import (Favorite, Ingredient, Recipe,
-                            RecipeIngredient, ShoppingCart, Tag)
+                            ShoppingCart, ShoppingListItem, Tag)
 from users.models import Subscription, User
 
 
 class UserSubscribeView(APIView):
     """Создание/удаление подписки на пользователя."""
+    @idempotent
     def post(self, request, user_id):
+        recipes_limit = get_recipes_limit(request)
         author = get_object_or_404(User, id=user_id)
-        serializer = UserSubscribeSerializer(
-            data={'user': request.user.id, 'author': author.id},
-            context={'request': request}
-        )
+        serializer = UserSubscribeSerializer(data={}, context={
+            'request': request, 'author': author,
+            'recipes_limit': recipes_limit,
+        })
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            serializer.save(user=request.user, author=author)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @idempotent
     def delete(self, request, user_id):
         author = get_object_or_404(User, id=user_id)
-        if not Subscription.objects.filter(user=request.user,
-                                           author=author).exists():
+        deleted = delete_locked(Subscription.objects.filter(
+            user=request.user, author=author
+        ))
+        if not deleted:
             return Response(
                 {'errors': 'Вы не подписаны на этого пользователя'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        Subscription.objects.get(user=request.user.id,
-                                 author=user_id).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class UserViewSet(DjoserUserViewSet):
+    """Пользователи. Для списка и профиля загружаются только
+    выводимые поля, а подписка определяется одним подзапросом.
+    Параметр search ищет по началу имени пользователя.
+    """
+    pagination_class = PageLimitPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+        user = self.request.user
+        if user.is_authenticated:
+            is_subscribed = Exists(Subscription.objects.filter(
+                user=user, author=OuterRef('pk')
+            ))
+        else:
+            is_subscribed = Value(False, output_field=BooleanField())
+        queryset = queryset.only(
+            'id', 'email', 'username', 'first_name', 'last_name'
+        ).annotate(is_subscribed=is_subscribed)
+        search = self.request.query_params.get('search')
+        if search and self.action == 'list':
+            queryset = queryset.filter(username__startswith=search)
+        return queryset
+
+
 class UserSubscriptionsViewSet(mixins.ListModelMixin,
                                viewsets.GenericViewSet):
     """Получение списка всех подписок на пользователей."""
     serializer_class = UserSubscribeRepresentSerializer
+    pagination_class = PageLimitPagination
 
     def get_queryset(self):
-        return User.objects.filter(following__user=self.request.user)
+        return User.objects.filter(
+            following__user=self.request.user
+        ).annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+        ).order_by('id')
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['recipes_limit'] = get_recipes_limit(self.request)
+        return context
 
 
+@method_decorator([
+    cache_control(public=True, max_age=settings.API_CACHE_MAX_AGE),
+    condition(etag_func=tags_etag, last_modified_func=tags_last_modified),
+], name='dispatch')
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     """Получение информации о тегах."""
     queryset = Tag.objects.all()
@@ -62,7 +128,19 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = (AllowAny, )
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        if not request.query_params:
+            response = snapshot_response(request, 'tags')
+            if response is not None:
+                return response
+        return super().list(request, *args, **kwargs)
 
+
+@method_decorator([
+    cache_control(public=True, max_age=settings.API_CACHE_MAX_AGE),
+    condition(etag_func=ingredients_etag,
+              last_modified_func=ingredients_last_modified),
+], name='dispatch')
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     """Получение информации об ингредиентах."""
     queryset = Ingredient.objects.all()
@@ -72,25 +150,152 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_class = IngredientFilter
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if set(request.query_params) <= {'name'}:
+            response = snapshot_response(request, get_ingredients_name(name))
+            if response is not None:
+                return response
+        if not name:
+            return super().list(request, *args, **kwargs)
+        serializer = self.get_serializer(
+            ingredient_index.search(name, settings.INGREDIENT_SEARCH_LIMIT),
+            many=True
+        )
+        return Response(serializer.data)
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     """Работа с рецептами."""
-    queryset = Recipe.objects.all()
     permission_classes = (IsAdminAuthorOrReadOnly, )
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (DjangoFilterBackend, RecipeOrderingFilter)
     filterset_class = RecipeFilter
+    ordering_fields = ('id', 'favorites_count', 'carts_count')
+    ordering = ('-id',)
+    pagination_class = RecipePagination
     http_method_names = ['get', 'post', 'patch', 'delete']
 
+    def get_queryset(self):
+        fields = None
+        if self.action in ('list', 'retrieve', 'cook', 'trending', 'feed'):
+            fields = RecipeGetSerializer.select_fields(
+                RecipeGetSerializer.Meta.fields, self.request
+            )
+        return Recipe.objects.with_related(fields).with_user_flags(
+            self.request.user, fields
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == 'retrieve':
+            context['image_rendition'] = 'detail'
+        elif self.action in ('list', 'cook', 'trending', 'feed'):
+            context['image_rendition'] = 'thumbnail'
+        return context
+
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'cook', 'trending', 'feed'):
             return RecipeGetSerializer
         return RecipeCreateSerializer
 
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        return cached_response(
+            get_list_key(request),
+            lambda: super(RecipeViewSet, self).list(request, *args, **kwargs)
+        )
+
+    @method_decorator([
+        cache_control(private=True, no_cache=True),
+        vary_on_headers('Authorization'),
+        condition(etag_func=recipe_etag,
+                  last_modified_func=recipe_last_modified),
+    ])
+    def retrieve(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().retrieve(request, *args, **kwargs)
+        return cached_response(
+            get_detail_key(request, kwargs['pk']),
+            lambda: super(RecipeViewSet, self).retrieve(
+                request, *args, **kwargs
+            )
+        )
+
+    @action(
+        detail=False,
+        methods=['get'],
+        pagination_class=PageLimitPagination
+    )
+    def cook(self, request):
+        """Подбор рецептов по имеющимся ингредиентам.
+        Параметр missing - сколько ингредиентов может не хватать.
+        """
+        try:
+            ingredient_ids = [
+                int(ingredient_id) for ingredient_id
+                in request.query_params.getlist('ingredients')
+            ]
+            max_missing = int(request.query_params.get('missing', 0))
+        except ValueError:
+            return Response(
+                {'errors': 'Некорректный список ингредиентов'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        recipe_ids = self.paginate_queryset(
+            recipe_ingredient_index.match(ingredient_ids, max_missing)
+        )
+        recipes = self.get_queryset().in_bulk(recipe_ids)
+        serializer = self.get_serializer(
+            [recipes[recipe_id] for recipe_id in recipe_ids
+             if recipe_id in recipes],
+            many=True
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        pagination_class=PageLimitPagination
+    )
+    def trending(self, request):
+        """Популярные рецепты по оценке, которую
+        периодически пересчитывает команда update_trending.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            score__isnull=False
+        ).order_by('-score__score', '-id')
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated, ],
+        pagination_class=RecipeFeedPagination
+    )
+    def feed(self, request):
+        """Новые рецепты авторов, на которых подписан пользователь."""
+        recipe_ids = self.paginate_queryset(get_feed(
+            request.user,
+            self.paginator.get_before(request),
+            self.paginator.get_page_size(request) + 1
+        ))
+        recipes = self.get_queryset().in_bulk(recipe_ids)
+        serializer = self.get_serializer(
+            [recipes[recipe_id] for recipe_id in recipe_ids
+             if recipe_id in recipes],
+            many=True
+        )
+        return self.get_paginated_response(serializer.data)
+
     @action(
         detail=True,
         methods=['post', 'delete'],
         permission_classes=[IsAuthenticated, ]
     )
+    @idempotent
     def favorite(self, request, pk):
         """Работа с избранными рецептами."""
         recipe = get_object_or_404(Recipe, id=pk)
@@ -107,6 +312,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         methods=['post', 'delete'],
         permission_classes=[IsAuthenticated, ]
     )
+    @idempotent
     def shopping_cart(self, request, pk):
         """Работа со списком покупок.
         Удаление/добавление в список покупок.
@@ -124,22 +330,32 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(
         detail=False,
         methods=['get'],
-        permission_classes=[IsAuthenticated, ]
+        permission_classes=[IsAuthenticated, ],
+        renderer_classes=[ShoppingCartTextRenderer, ShoppingCartCSVRenderer,
+                          ShoppingCartPDFRenderer],
+        content_negotiation_class=FallbackContentNegotiation
     )
     def download_shopping_cart(self, request):
-        """Отправка файла со списком покупок."""
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__carts__user=request.user
+        """Отправка файла со списком покупок.
+        Формат выбирается параметром format: txt, csv или pdf,
+        по умолчанию - текстовый файл.
+        """
+        ingredients = ShoppingListItem.objects.filter(
+            user=request.user
         ).values(
+            'ingredient__name', 'ingredient__measurement_unit',
+            ingredient_amount=F('total_amount')
+        ).order_by(
             'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(ingredient_amount=Sum('amount'))
-        shopping_list = ['Список покупок:\n']
-        for ingredient in ingredients:
-            name = ingredient['ingredient__name']
-            unit = ingredient['ingredient__measurement_unit']
-            amount = ingredient['ingredient_amount']
-            shopping_list.append(f'\n{name} - {amount}, {unit}')
-        response = HttpResponse(shopping_list, content_type='text/plain')
-        response['Content-Disposition'] = \
-            'attachment; filename="shopping_cart.txt"'
+        ).iterator()
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        response = StreamingHttpResponse(
+            renderer.stream(ingredients), content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_cart.{renderer.format}"'
+        )
         return response
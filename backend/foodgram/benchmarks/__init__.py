@@ -0,0 +1,11 @@
+"""Замеры производительности.
+Запускаются из каталога backend/foodgram, например
+python -m benchmarks.tag_filter, и работают во временной
+базе, которая создаётся и удаляется, как при запуске тестов.
+"""
+import os
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+django.setup()
@@ -0,0 +1,92 @@
+"""Лента подписок: 50 тысяч авторов по 4 рецепта.
+Сравнивает фильтр author__in, слияние потоков авторов
+и ленту подписок для 10, 1000 и 10 000 подписок,
+на первой странице и в глубине ленты.
+Нужна PostgreSQL: слияние потоков использует LATERAL.
+"""
+from django.db import connection
+
+from benchmarks.utils import (analyze, benchmark_database, measure,
+                              measure_once, print_table)
+from recipes import feed
+from recipes.models import FeedInbox, Recipe
+from users.models import Subscription, User
+
+AUTHORS = 50 * 1000
+RECIPES_PER_AUTHOR = 4
+SUBSCRIPTIONS = (10, 1000, 10 * 1000)
+PAGE_SIZE = 11
+
+
+def populate():
+    User.objects.bulk_create(
+        User(username=f'author{number}', email=f'author{number}@x.ru')
+        for number in range(AUTHORS)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO recipes_recipe (author_id, name, image, text, '
+            'cooking_time, updated_at, favorites_count, carts_count) '
+            "SELECT author.id, 'r', '', 't', 1, now(), 0, 0 "
+            'FROM users_user author, generate_series(1, %s)',
+            [RECIPES_PER_AUTHOR]
+        )
+    return User.objects.create(username='reader', email='reader@x.ru')
+
+
+def get_author_in_ids(user, before):
+    recipes = Recipe.objects.filter(author__in=Subscription.objects.filter(
+        user=user
+    ).values('author'))
+    if before is not None:
+        recipes = recipes.filter(id__lt=before)
+    return list(recipes.order_by('-id').values_list('id', flat=True)[
+        :PAGE_SIZE
+    ])
+
+
+def subscribe(user, count):
+    Subscription.objects.filter(user=user).delete()
+    FeedInbox.objects.filter(user=user).delete()
+    authors = list(User.objects.exclude(id=user.id).order_by('id'))
+    Subscription.objects.bulk_create(
+        Subscription(user=user, author=author)
+        for author in authors[::len(authors) // count][:count]
+    )
+
+
+def main():
+    with benchmark_database('postgresql'):
+        user = populate()
+        rows = []
+        for count in SUBSCRIPTIONS:
+            subscribe(user, count)
+            build = measure_once(lambda: feed.build_inbox(user))
+            analyze()
+            deep = Recipe.objects.filter(
+                author__following__user=user
+            ).order_by('id').values_list('id', flat=True)[count]
+            for page, before in (('first', None), ('deep', deep)):
+                results = {
+                    get_ids(user, before, PAGE_SIZE)
+                    == get_author_in_ids(user, before)
+                    for get_ids in (feed.get_merged_ids, feed.get_inbox_ids)
+                }
+                assert results == {True}
+                rows.append((
+                    count, page,
+                    measure(lambda: get_author_in_ids(user, before), 20),
+                    measure(lambda: feed.get_merged_ids(
+                        user, before, PAGE_SIZE
+                    ), 20),
+                    measure(lambda: feed.get_inbox_ids(
+                        user, before, PAGE_SIZE
+                    ), 20),
+                    build if page == 'first' else '',
+                ))
+        print_table(('subscriptions', 'page', 'author__in ms', 'merged ms',
+                     'inbox ms', 'inbox build ms'), rows)
+
+
+if __name__ == '__main__':
+    main()
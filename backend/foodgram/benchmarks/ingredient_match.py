@@ -0,0 +1,119 @@
+"""Подбор рецептов по ингредиентам: 100 тысяч рецептов
+и 2 тысячи ингредиентов. Сравнивает индекс ингредиент -> рецепты
+с GROUP BY по RecipeIngredient, а также полную пересборку индекса
+с дочитыванием изменённых рецептов в другом процессе.
+Нужна PostgreSQL: данные вставляются через generate_series.
+"""
+from django.db import connection
+from django.db.models import Count, F, Q
+
+from benchmarks.utils import (analyze, benchmark_database,
+                              get_index_size, measure, print_table)
+from recipes.indexes import RecipeIngredientIndex, recipe_ingredient_index
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from users.models import User
+
+RECIPES = 100 * 1000
+INGREDIENTS = 2000
+PANTRY_SIZES = (5, 20, 100)
+MAX_MISSING = (0, 2)
+CHANGED_RECIPES = (1, 100, 1000)
+
+
+def populate():
+    """У рецепта от 5 до 12 ингредиентов, распространённые
+    ингредиенты встречаются чаще редких.
+    """
+    author = User.objects.create(username='author', email='author@x.ru')
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+        for number in range(INGREDIENTS)
+    )
+    first_id = Ingredient.objects.order_by('id').values_list(
+        'id', flat=True
+    ).first()
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT setseed(0.5)')
+        cursor.execute(
+            'INSERT INTO recipes_recipe (author_id, name, image, text, '
+            'cooking_time, updated_at, favorites_count, carts_count) '
+            "SELECT %s, 'r', '', 't', 1, now(), 0, 0 "
+            'FROM generate_series(1, %s)', [author.id, RECIPES]
+        )
+        cursor.execute(
+            'INSERT INTO recipes_recipeingredient '
+            '(recipe_id, ingredient_id, amount) '
+            'SELECT recipe.id, %s + floor(%s * power(random(), 3)), 1 '
+            'FROM recipes_recipe recipe, '
+            'generate_series(1, 5 + recipe.id %% 8) '
+            'ON CONFLICT DO NOTHING', [first_id, INGREDIENTS]
+        )
+    analyze()
+    return first_id
+
+
+def match_sql(ingredient_ids, max_missing):
+    """То же, что RecipeIngredientIndex.match, одним запросом."""
+    recipes = RecipeIngredient.objects.values('recipe').annotate(
+        total=Count('id'),
+        matched=Count('id', filter=Q(ingredient__in=ingredient_ids)),
+    ).filter(
+        matched__gt=0, total__lte=F('matched') + max_missing
+    ).order_by(
+        F('total') - F('matched'),
+        -F('matched') * 1.0 / F('total'),
+        '-recipe_id',
+    )
+    return list(recipes.values_list('recipe', flat=True))
+
+
+def benchmark_match(first_id):
+    rows = []
+    for size in PANTRY_SIZES:
+        ingredient_ids = list(range(first_id, first_id + size))
+        for max_missing in MAX_MISSING:
+            matched = recipe_ingredient_index.match(ingredient_ids,
+                                                    max_missing)
+            assert matched == match_sql(ingredient_ids, max_missing)
+            rows.append((
+                size, max_missing, len(matched),
+                measure(lambda: match_sql(ingredient_ids, max_missing)),
+                measure(lambda: recipe_ingredient_index.match(
+                    ingredient_ids, max_missing
+                )),
+            ))
+    print_table(('pantry', 'missing', 'recipes', 'sql ms', 'index ms'),
+                rows)
+
+
+def benchmark_refresh():
+    worker = RecipeIngredientIndex()
+    build = measure(worker.build, repeat=3)
+    size = get_index_size(worker.get_data())
+    rows = [('full build', build, size / 1024 / 1024)]
+    recipe_ids = list(
+        Recipe.objects.order_by('?').values_list('id', flat=True)[
+            :max(CHANGED_RECIPES)
+        ]
+    )
+    for changed in CHANGED_RECIPES:
+
+        def change_in_other_process():
+            recipe_ingredient_index.recipes_changed(recipe_ids[:changed])
+            worker.get_data()
+
+        rows.append((f'refresh {changed} recipes',
+                     measure(change_in_other_process), ''))
+    assert worker.get_data() == worker.build()
+    print_table(('index', 'ms', 'MB'), rows)
+
+
+def main():
+    with benchmark_database('postgresql'):
+        first_id = populate()
+        benchmark_refresh()
+        benchmark_match(first_id)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""Сериализация и JSON-рендеринг 1000 рецептов: быстрый путь
+(FastReadMixin и FastJSONRenderer) против стандартного пути DRF.
+Заодно проверяет, что ответы основных эндпоинтов совпадают
+побайтно на обоих путях.
+"""
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from rest_framework import serializers as drf_serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api import renderers, serializers
+from benchmarks.utils import benchmark_database, measure, print_table
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            Tag)
+from users.models import Subscription, User
+
+USERS = 20
+TAGS = 5
+INGREDIENTS = 300
+RECIPES = 1000
+INGREDIENTS_PER_RECIPE = 8
+URLS = (
+    '/api/recipes/?limit=50', '/api/recipes/?limit=50&view=card',
+    '/api/tags/', '/api/ingredients/', '/api/ingredients/?name=ингр',
+    '/api/users/?limit=20', '/api/users/me/',
+    '/api/users/subscriptions/?recipes_limit=2',
+)
+
+
+def populate():
+    users = [
+        User.objects.create(username=f'user{number}',
+                            email=f'user{number}@x.ru',
+                            first_name='Имя', last_name='Фамилия')
+        for number in range(USERS)
+    ]
+    tags = [
+        Tag.objects.create(name=f'тег {number}', color=f'#00000{number}',
+                           slug=f'tag{number}')
+        for number in range(TAGS)
+    ]
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'ингредиент "{number}"', measurement_unit='г')
+        for number in range(INGREDIENTS)
+    )
+    ingredients = list(Ingredient.objects.all())
+    Recipe.objects.bulk_create(
+        Recipe(author=users[number % USERS], name=f'Рецепт {number}',
+               text='Текст\n' * 30, cooking_time=5 + number,
+               image='recipes/image.png')
+        for number in range(RECIPES)
+    )
+    recipes = list(Recipe.objects.all())
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe=recipe,
+                            tag=tags[(recipe.id + number) % TAGS])
+        for recipe in recipes for number in range(2)
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(
+            recipe=recipe,
+            ingredient=ingredients[(recipe.id * 7 + number) % INGREDIENTS],
+            amount=number + 1
+        )
+        for recipe in recipes for number in range(INGREDIENTS_PER_RECIPE)
+    )
+    user = users[0]
+    for author in users[1:10]:
+        Subscription.objects.create(user=user, author=author)
+    for recipe in recipes[:50]:
+        Favorite.objects.create(user=user, recipe=recipe)
+    return user
+
+
+@contextmanager
+def drf_path():
+    """Временно возвращает стандартные to_representation и render."""
+    saved = (serializers.FastReadMixin.to_representation,
+             serializers.FastReadListSerializer.to_representation,
+             renderers.FastJSONRenderer.render)
+    serializers.FastReadMixin.to_representation = (
+        drf_serializers.Serializer.to_representation
+    )
+    serializers.FastReadListSerializer.to_representation = (
+        drf_serializers.ListSerializer.to_representation
+    )
+    renderers.FastJSONRenderer.render = JSONRenderer.render
+    try:
+        yield
+    finally:
+        (serializers.FastReadMixin.to_representation,
+         serializers.FastReadListSerializer.to_representation,
+         renderers.FastJSONRenderer.render) = saved
+
+
+@contextmanager
+def without_orjson():
+    saved, renderers.orjson = renderers.orjson, None
+    try:
+        yield
+    finally:
+        renderers.orjson = saved
+
+
+def get_responses(user):
+    authorized = APIClient()
+    authorized.force_authenticate(user)
+    responses = []
+    for client in (APIClient(), authorized):
+        for url in URLS:
+            cache.clear()
+            response = client.get(url, HTTP_ACCEPT='application/json')
+            responses.append((url, response.status_code, response.content))
+    return responses
+
+
+def check_responses(user):
+    fast = get_responses(user)
+    with drf_path():
+        slow = get_responses(user)
+    for response, slow_response in zip(fast, slow):
+        assert response == slow_response, response[0]
+
+
+def main():
+    with benchmark_database():
+        user = populate()
+        check_responses(user)
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = user
+        recipes = list(Recipe.objects.with_related().with_user_flags(user))
+        context = {'request': request, 'image_rendition': 'thumbnail'}
+
+        def serialize():
+            return serializers.RecipeGetSerializer(
+                recipes, many=True, context=context
+            ).data
+
+        def render():
+            return renderers.FastJSONRenderer().render(serialize())
+
+        body = render()
+        rows = [('fast', measure(serialize, 10), measure(render, 10))]
+        with without_orjson():
+            assert render() == body
+            rows.append(('fast without orjson', '', measure(render, 10)))
+        with drf_path():
+            assert render() == body
+            rows.append(('drf', measure(serialize, 10), measure(render, 10)))
+        print_table(('path', 'serialize ms', 'serialize + render ms'),
+                    rows)
+
+
+if __name__ == '__main__':
+    main()
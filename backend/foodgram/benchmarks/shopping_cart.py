@@ -0,0 +1,102 @@
+"""Выгрузка списка покупок для корзин из 1000 и 5000 рецептов
+по 8 ингредиентов из 2000. Сравнивает прежнюю сборку текста
+из JOIN по корзине с потоковой выгрузкой txt, csv и pdf
+по времени и пиковой памяти Python.
+"""
+from django.db.models import Sum
+from django.http import HttpResponse
+from rest_framework.test import APIClient
+
+from benchmarks.utils import (analyze, benchmark_database, measure,
+                              measure_memory, print_table)
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, ShoppingListItem)
+from users.models import User
+
+INGREDIENTS = 2000
+RECIPES = 5000
+INGREDIENTS_PER_RECIPE = 8
+CART_SIZES = (1000, 5000)
+FORMATS = ('txt', 'csv', 'pdf')
+
+
+def populate():
+    author = User.objects.create(username='author', email='author@x.ru')
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'ингредиент номер {number}', measurement_unit='г')
+        for number in range(INGREDIENTS)
+    )
+    ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+    Recipe.objects.bulk_create(
+        Recipe(author=author, name='r', text='t', cooking_time=1)
+        for _ in range(RECIPES)
+    )
+    recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+    RecipeIngredient.objects.bulk_create((
+        RecipeIngredient(
+            recipe_id=recipe_id,
+            ingredient_id=ingredient_ids[
+                (recipe_id * 31 + number * 997) % INGREDIENTS
+            ],
+            amount=number + 1
+        )
+        for recipe_id in recipe_ids
+        for number in range(INGREDIENTS_PER_RECIPE)
+    ), batch_size=1000)
+    users = []
+    for size in CART_SIZES:
+        user = User.objects.create(username=f'buyer{size}',
+                                   email=f'buyer{size}@x.ru')
+        ShoppingCart.objects.bulk_create((
+            ShoppingCart(user=user, recipe_id=recipe_id)
+            for recipe_id in recipe_ids[:size]
+        ), batch_size=1000)
+        users.append(user)
+    ShoppingListItem.objects.rebuild()
+    analyze()
+    return users
+
+
+def download_joined(user):
+    """Прежняя выгрузка: сумма по корзине и текст целиком в памяти."""
+    ingredients = RecipeIngredient.objects.filter(
+        recipe__carts__user=user
+    ).values(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).annotate(ingredient_amount=Sum('amount'))
+    shopping_list = ['Список покупок:\n']
+    for ingredient in ingredients:
+        name = ingredient['ingredient__name']
+        unit = ingredient['ingredient__measurement_unit']
+        amount = ingredient['ingredient_amount']
+        shopping_list.append(f'\n{name} - {amount}, {unit}')
+    return HttpResponse(shopping_list, content_type='text/plain').content
+
+
+def download(client, format):
+    response = client.get(
+        f'/api/recipes/download_shopping_cart/?format={format}'
+    )
+    assert response.status_code == 200
+    return b''.join(response.streaming_content)
+
+
+def main():
+    with benchmark_database():
+        rows = []
+        for user in populate():
+            client = APIClient()
+            client.force_authenticate(user)
+            size = ShoppingCart.objects.filter(user=user).count()
+            downloads = [('joined txt', lambda: download_joined(user))] + [
+                (format, lambda format=format: download(client, format))
+                for format in FORMATS
+            ]
+            for name, function in downloads:
+                rows.append((size, name, len(function()) // 1024,
+                             measure(function, 10), measure_memory(function)))
+        print_table(('cart', 'export', 'KB', 'ms', 'peak MB'), rows)
+
+
+if __name__ == '__main__':
+    main()
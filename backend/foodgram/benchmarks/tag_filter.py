@@ -0,0 +1,120 @@
+"""Фильтр рецептов по тегам на миллионе рецептов.
+Сравнивает JOIN с DISTINCT, подзапрос EXISTS и список id
+из индекса тег -> рецепты, а также полную пересборку индекса
+с дочитыванием изменённых рецептов в другом процессе.
+Нужна PostgreSQL: данные вставляются через generate_series.
+"""
+import sys
+
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from django.http import QueryDict
+from django.test.utils import override_settings
+
+from api.filters import RecipeFilter
+from benchmarks.utils import (analyze, benchmark_database,
+                              get_index_size, measure, print_table)
+from recipes.indexes import TagRecipeIndex, tag_recipe_index
+from recipes.models import Recipe, Tag
+from users.models import User
+
+RECIPES = 1000 * 1000
+TAGS = 8
+PAGE_SIZE = 6
+PAGE = 50
+TAG_QUERIES = (
+    ('t7',), ('t5', 't6'), ('t4',), ('t3',), ('t2',), ('t0', 't1')
+)
+CHANGED_RECIPES = (1, 100, 1000)
+
+
+def populate():
+    """Тег ti стоит примерно на каждом 2^(i+1)-м рецепте."""
+    author = User.objects.create(username='author', email='author@x.ru')
+    Tag.objects.bulk_create(
+        Tag(name=f't{index}', color=f'#{index:06d}', slug=f't{index}')
+        for index in range(TAGS)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO recipes_recipe (author_id, name, image, text, '
+            'cooking_time, updated_at, favorites_count, carts_count) '
+            "SELECT %s, 'r', '', 't', 1, now(), 0, 0 "
+            'FROM generate_series(1, %s)', [author.id, RECIPES]
+        )
+        for index, tag in enumerate(Tag.objects.order_by('slug')):
+            cursor.execute(
+                'INSERT INTO recipes_recipe_tags (recipe_id, tag_id) '
+                'SELECT id, %s FROM recipes_recipe '
+                'WHERE (id * 2654435761 %% 1000003) %% %s = 0',
+                [tag.id, 2 ** (index + 1)]
+            )
+    analyze()
+
+
+def get_filtered(slugs, mode):
+    queryset = Recipe.objects.all()
+    if mode == 'join':
+        return queryset.filter(tags__slug__in=slugs).distinct()
+    if mode == 'exists':
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk'), tag__slug__in=slugs
+        )))
+    data = QueryDict(mutable=True)
+    data.setlist('tags', slugs)
+    with override_settings(TAG_FILTER_MAX_IDS=sys.maxsize):
+        return RecipeFilter(data, queryset=queryset).qs
+
+
+def filter_page(slugs, mode):
+    """Число рецептов и страница, как в PageNumberPagination."""
+    queryset = get_filtered(slugs, mode)
+    queryset.count()
+    start = PAGE * PAGE_SIZE
+    list(queryset.values_list('id', flat=True)[start:start + PAGE_SIZE])
+
+
+def benchmark_filter():
+    rows = []
+    for slugs in TAG_QUERIES:
+        count = get_filtered(slugs, 'exists').count()
+        rows.append((
+            ','.join(slugs), count,
+            *(measure(lambda: filter_page(slugs, mode))
+              for mode in ('join', 'exists', 'index'))
+        ))
+    print_table(('tags', 'recipes', 'join ms', 'exists ms', 'index ms'),
+                rows)
+
+
+def benchmark_refresh():
+    worker = TagRecipeIndex()
+    build = measure(worker.build, repeat=3)
+    size = get_index_size(worker.get_data())
+    rows = [('full build', build, size / 1024 / 1024)]
+    recipe_ids = list(
+        Recipe.objects.order_by('?').values_list('id', flat=True)[
+            :max(CHANGED_RECIPES)
+        ]
+    )
+    for changed in CHANGED_RECIPES:
+
+        def change_in_other_process():
+            tag_recipe_index.recipes_changed(recipe_ids[:changed])
+            worker.get_data()
+
+        rows.append((f'refresh {changed} recipes',
+                     measure(change_in_other_process), ''))
+    assert worker.get_data() == worker.build()
+    print_table(('index', 'ms', 'MB'), rows)
+
+
+def main():
+    with benchmark_database('postgresql'):
+        populate()
+        benchmark_refresh()
+        benchmark_filter()
+
+
+if __name__ == '__main__':
+    main()
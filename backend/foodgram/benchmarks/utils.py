@@ -0,0 +1,81 @@
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import override_settings
+
+from recipes.tests.base import LOCMEM_CACHES
+
+
+@contextmanager
+def benchmark_database(vendor=None):
+    """Временная база и кэш в памяти процесса на время замера."""
+    if vendor is not None and connection.vendor != vendor:
+        sys.exit(f'Замер рассчитан на базу {vendor}, '
+                 f'а настроена {connection.vendor}')
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        with override_settings(CACHES=LOCMEM_CACHES):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def measure(function, repeat=5):
+    """Лучшее время вызова в миллисекундах после прогрева."""
+    function()
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def measure_once(function):
+    """Время единственного вызова в миллисекундах."""
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1000
+
+
+def measure_memory(function):
+    """Пиковый прирост памяти Python за вызов в мегабайтах."""
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def print_table(header, rows):
+    """Печатает строки таблицей, числа - с одним знаком после запятой."""
+    rows = [
+        [f'{value:.1f}' if isinstance(value, float) else str(value)
+         for value in row]
+        for row in [header, *rows]
+    ]
+    widths = [max(len(row[column]) for row in rows)
+              for column in range(len(header))]
+    for row in rows:
+        print('  '.join(value.rjust(width)
+                        for value, width in zip(row, widths)))
+    print()
+
+
+def get_index_size(data):
+    """Примерный размер данных InvertedIndex в байтах."""
+    return sum(
+        sys.getsizeof(key) + sys.getsizeof(values)
+        for index in data for key, values in index.items()
+    ) + sum(sys.getsizeof(index) for index in data)
+
+
+def analyze():
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
@@ -22,6 +22,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'djoser',
@@ -83,6 +84,17 @@ DATABASES = {
     }
 }
 
+# Кэш хранит версии данных, по которым сбрасываются кэши ответов
+# и индексы в памяти, поэтому он должен быть общим для всех процессов.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.memcached.PyMemcacheCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'memcached:11211'),
+    }
+}
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -130,6 +142,10 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.PageLimitPagination',
     'PAGE_SIZE': 6,
 }
@@ -149,3 +165,36 @@ DJOSER = {
 }
 
 EMPTY_VALUE = '-пусто-'
+
+INGREDIENT_SEARCH_LIMIT = 50
+
+RECIPE_CACHE_TIMEOUT = 60 * 10
+
+API_CACHE_MAX_AGE = 60
+
+IMAGE_WORKERS = 2
+
+RECIPE_IMAGE_MAX_SIZE = 5 * 1024 * 1024
+
+RECIPE_IMAGE_MAX_PIXELS = 25 * 1000 * 1000
+
+DATA_UPLOAD_MAX_MEMORY_SIZE = RECIPE_IMAGE_MAX_SIZE * 4 // 3 + 1024 * 1024
+
+SHOPPING_CART_PDF_FONT = os.getenv(
+    'SHOPPING_CART_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+TRENDING_HALF_LIFE_HOURS = 24
+
+FEED_INBOX_MIN_SUBSCRIPTIONS = 300
+
+IDEMPOTENCY_KEY_TIMEOUT = 60 * 60 * 24
+
+IDEMPOTENCY_LOCK_TIMEOUT = 30
+
+TAG_FILTER_MAX_IDS = 10000
+
+SNAPSHOT_ROOT = os.path.join(MEDIA_ROOT, 'snapshots')
+
+SNAPSHOT_PREFIX_LENGTH = 2
@@ -2,7 +2,8 @@ from django.conf import settings
 from django.contrib import admin
 
 from recipes.models import (Favorite, Ingredient, Recipe,
-                            RecipeIngredient, ShoppingCart, Tag)
+                            RecipeIngredient, RecipeScore, ShoppingCart,
+                            ShoppingListItem, Tag)
 
 
 @admin.register(Tag)
@@ -28,6 +29,7 @@ class RecipeIngredientInline(admin.TabularInline):
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ('pk', 'name', 'author', 'favorites_amount')
+    readonly_fields = ('favorites_count', 'carts_count')
     search_fields = ('name', 'author')
     list_filter = ('name', 'author', 'tags')
     empty_value_display = settings.EMPTY_VALUE
@@ -35,8 +37,9 @@ class RecipeAdmin(admin.ModelAdmin):
         RecipeIngredientInline,
     ]
 
+    @admin.display(description='В избранном', ordering='favorites_count')
     def favorites_amount(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
 
 @admin.register(RecipeIngredient)
@@ -47,13 +50,27 @@ class RecipeIngredientAdmin(admin.ModelAdmin):
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'user', 'recipe')
+    list_display = ('pk', 'user', 'recipe', 'created_at')
     search_fields = ('user', 'recipe')
     empty_value_display = settings.EMPTY_VALUE
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'user', 'recipe')
+    list_display = ('pk', 'user', 'recipe', 'created_at')
     search_fields = ('user', 'recipe')
     empty_value_display = settings.EMPTY_VALUE
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'user', 'ingredient', 'total_amount')
+    search_fields = ('user__username', 'ingredient__name')
+    empty_value_display = settings.EMPTY_VALUE
+
+
+@admin.register(RecipeScore)
+class RecipeScoreAdmin(admin.ModelAdmin):
+    list_display = ('recipe', 'score', 'updated_at')
+    search_fields = ('recipe__name',)
+    empty_value_display = settings.EMPTY_VALUE
@@ -0,0 +1,58 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.versions import bump_version
+from users.models import Subscription, User
+
+COUNTERS = {
+    Favorite: (Recipe, 'recipe', 'favorites_count'),
+    ShoppingCart: (Recipe, 'recipe', 'carts_count'),
+    Recipe: (User, 'author', 'recipes_count'),
+    Subscription: (User, 'author', 'followers_count'),
+}
+
+
+def get_counter_version_name(counter):
+    """Версия значений счётчика, по которым сортируются списки."""
+    return f'counter:{counter}'
+
+
+def update_counter(instance, delta):
+    """Изменяет счётчик, связанный с объектом, на delta."""
+    model, field_name, counter = COUNTERS[type(instance)]
+    model.objects.filter(
+        pk=getattr(instance, f'{field_name}_id')
+    ).update(**{counter: F(counter) + delta})
+    transaction.on_commit(
+        lambda: bump_version(get_counter_version_name(counter))
+    )
+
+
+def get_actual_count(sender):
+    """Выражение для пересчёта счётчика по связанным объектам."""
+    field_name = COUNTERS[sender][1]
+    return Coalesce(Subquery(
+        sender.objects.filter(
+            **{field_name: OuterRef('pk')}
+        ).order_by().values(field_name).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def reconcile_counter(sender, fix=True):
+    """Находит расхождения счётчика с реальным числом объектов
+    и при fix=True исправляет их. Возвращает id исправленных записей.
+    """
+    model, _, counter = COUNTERS[sender]
+    drifted = list(model.objects.annotate(
+        actual_count=get_actual_count(sender)
+    ).exclude(**{counter: F('actual_count')}).values_list('pk', flat=True))
+    if drifted and fix:
+        model.objects.filter(pk__in=drifted).update(
+            **{counter: get_actual_count(sender)}
+        )
+        bump_version(get_counter_version_name(counter))
+    return drifted
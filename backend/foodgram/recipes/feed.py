@@ -0,0 +1,118 @@
+from django.conf import settings
+from django.db import connection, transaction
+
+from recipes.models import FeedInbox, FeedItem, Recipe
+from users.models import Subscription
+
+FEED_BATCH_SIZE = 1000
+
+
+def has_inbox(user):
+    """Проверяет, ведётся ли для пользователя лента подписок.
+    Ленту заводят, когда подписок становится слишком много
+    для слияния потоков авторов при чтении.
+    """
+    if FeedInbox.objects.filter(user=user).exists():
+        return True
+    subscriptions = Subscription.objects.filter(user=user).count()
+    if subscriptions < settings.FEED_INBOX_MIN_SUBSCRIPTIONS:
+        return False
+    build_inbox(user)
+    return True
+
+
+def build_inbox(user):
+    """Заводит ленту подписок и заполняет её рецептами авторов.
+    Лента и её записи фиксируются одной транзакцией, поэтому
+    другие запросы не увидят её заполненной наполовину.
+    """
+    with transaction.atomic():
+        _, created = FeedInbox.objects.get_or_create(user=user)
+        if created:
+            fill_inbox(user.id, Recipe.objects.filter(
+                author__following__user=user
+            ))
+
+
+def fill_inbox(user_id, recipes):
+    """Добавляет рецепты в ленту одним INSERT ... SELECT,
+    не передавая их id через Python.
+    """
+    sql, params = recipes.order_by().values('id').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {FeedItem._meta.db_table} (user_id, recipe_id) '
+            f'SELECT %s, recipe.id FROM ({sql}) recipe '
+            f'WHERE true ON CONFLICT DO NOTHING',
+            [user_id, *params]
+        )
+
+
+def push_recipe(recipe):
+    """Добавляет новый рецепт в ленты подписчиков автора."""
+    user_ids = FeedInbox.objects.filter(
+        user__follower__author=recipe.author_id
+    ).values_list('user', flat=True)
+    FeedItem.objects.bulk_create(
+        (FeedItem(user_id=user_id, recipe_id=recipe.id)
+         for user_id in user_ids.iterator()),
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def subscribe(user_id, author_id):
+    if FeedInbox.objects.filter(user=user_id).exists():
+        fill_inbox(user_id, Recipe.objects.filter(author=author_id))
+
+
+def unsubscribe(user_id, author_id):
+    FeedItem.objects.filter(
+        user=user_id, recipe__author=author_id
+    ).delete()
+
+
+def get_inbox_ids(user, before, limit):
+    items = FeedItem.objects.filter(user=user)
+    if before is not None:
+        items = items.filter(recipe_id__lt=before)
+    return list(items.order_by('-recipe_id').values_list(
+        'recipe_id', flat=True
+    )[:limit])
+
+
+def get_merged_ids(user, before, limit):
+    """Сливает потоки рецептов авторов, на которых подписан
+    пользователь. В PostgreSQL из каждого потока берутся только
+    первые limit рецептов по индексу (author, -id).
+    """
+    if connection.vendor != 'postgresql':
+        recipes = Recipe.objects.filter(author__following__user=user)
+        if before is not None:
+            recipes = recipes.filter(id__lt=before)
+        return list(recipes.order_by('-id').values_list(
+            'id', flat=True
+        )[:limit])
+    condition = '' if before is None else 'AND recipe.id < %s'
+    params = [] if before is None else [before]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT feed.id FROM {Subscription._meta.db_table} subscription '
+            f'CROSS JOIN LATERAL (SELECT recipe.id '
+            f'FROM {Recipe._meta.db_table} recipe '
+            f'WHERE recipe.author_id = subscription.author_id {condition} '
+            f'ORDER BY recipe.id DESC LIMIT %s) feed '
+            f'WHERE subscription.user_id = %s '
+            f'ORDER BY feed.id DESC LIMIT %s',
+            [*params, limit, user.id, limit]
+        )
+        return [recipe_id for recipe_id, in cursor.fetchall()]
+
+
+def get_feed(user, before=None, limit=10):
+    """Возвращает id рецептов из подписок пользователя
+    с id меньше before, начиная с новых.
+    """
+    if has_inbox(user):
+        return get_inbox_ids(user, before, limit)
+    return get_merged_ids(user, before, limit)
@@ -0,0 +1,96 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from recipes.models import Recipe
+from recipes.versions import bump_version
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS = {
+    'thumbnail': (480, 480),
+    'detail': (1200, 1200),
+}
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_WORKERS,
+    thread_name_prefix='recipe-images'
+)
+pending = set()
+pending_lock = threading.Lock()
+
+
+def get_rendition_name(name, rendition):
+    """Путь к уменьшенной копии изображения в формате WebP."""
+    directory, filename = os.path.split(name)
+    base, _ = os.path.splitext(filename)
+    return os.path.join(directory, 'renditions', f'{base}_{rendition}.webp')
+
+
+def get_rendition_url(image, rendition):
+    """Ссылка на уменьшенную копию, если копии этого изображения
+    уже готовы, иначе на исходное изображение. Готовность
+    записана в рецепте, поэтому хранилище не опрашивается.
+    """
+    if getattr(image.instance, 'rendition_image', None) == image.name:
+        return default_storage.url(get_rendition_name(image.name, rendition))
+    return image.url
+
+
+def create_renditions(name):
+    """Создаёт уменьшенные копии изображения и отмечает
+    их готовность во всех рецептах с этим изображением.
+    """
+    missing = {
+        rendition: size for rendition, size in RENDITIONS.items()
+        if not default_storage.exists(get_rendition_name(name, rendition))
+    }
+    if missing:
+        with default_storage.open(name) as file:
+            image = ImageOps.exif_transpose(Image.open(file))
+            image.load()
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        for rendition, size in missing.items():
+            copy = image.copy()
+            copy.thumbnail(size)
+            buffer = BytesIO()
+            copy.save(buffer, 'WEBP', quality=80)
+            default_storage.save(get_rendition_name(name, rendition),
+                                 ContentFile(buffer.getvalue()))
+    recipes = Recipe.objects.filter(image=name).exclude(rendition_image=name)
+    recipe_ids = list(recipes.values_list('id', flat=True))
+    if not recipe_ids:
+        return
+    recipes.filter(id__in=recipe_ids).update(rendition_image=name)
+    bump_version('recipes')
+    for recipe_id in recipe_ids:
+        bump_version(f'recipe:{recipe_id}')
+
+
+def run_renditions(name):
+    try:
+        create_renditions(name)
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s', name)
+    finally:
+        with pending_lock:
+            pending.discard(name)
+
+
+def schedule_renditions(name):
+    """Ставит создание уменьшенных копий в очередь
+    фонового пула, не задерживая ответ на запрос.
+    """
+    with pending_lock:
+        if name in pending:
+            return
+        pending.add(name)
+    executor.submit(run_renditions, name)
@@ -0,0 +1,229 @@
+import threading
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from recipes.versions import bump_version, get_version
+
+CHANGE_LOG_LENGTH = 1000
+CHANGE_LOG_TIMEOUT = 60 * 60
+
+
+class VersionedIndex(ABC):
+    """Базовый класс индекса в памяти процесса.
+    Индекс обновляется, когда меняется версия version_name.
+    """
+    version_name = None
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None
+        self._data = None
+
+    @abstractmethod
+    def build(self):
+        """Собирает данные индекса из базы."""
+
+    def refresh(self, version):
+        """Данные индекса для новой версии."""
+        return self.build()
+
+    def get_data(self):
+        version = get_version(self.version_name)
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._data = self.refresh(version)
+                    self._version = version
+        return self._data
+
+
+class IngredientIndex(VersionedIndex):
+    """Индекс названий ингредиентов для быстрого автодополнения."""
+    version_name = 'ingredients'
+
+    def build(self):
+        ingredients = sorted(
+            Ingredient.objects.order_by().only(
+                'id', 'name', 'measurement_unit'
+            ),
+            key=lambda ingredient: (ingredient.name.casefold(),
+                                    ingredient.id)
+        )
+        return ([ingredient.name.casefold() for ingredient in ingredients],
+                ingredients)
+
+    def search(self, query, limit):
+        """Ищет ингредиенты: сначала полное совпадение,
+        затем совпадение по началу названия, затем по вхождению.
+        """
+        keys, ingredients = self.get_data()
+        query = query.casefold()
+        start = bisect_left(keys, query)
+        end = bisect_left(keys, query + '\U0010ffff', start)
+        exact = [
+            ingredient for key, ingredient
+            in zip(keys[start:end], ingredients[start:end]) if key == query
+        ]
+        prefix = [
+            ingredient for key, ingredient
+            in zip(keys[start:end], ingredients[start:end]) if key != query
+        ]
+        result = (exact + prefix)[:limit]
+        if len(result) < limit:
+            result += [
+                ingredient for index, (key, ingredient)
+                in enumerate(zip(keys, ingredients))
+                if query in key and not start <= index < end
+            ][:limit - len(result)]
+        return result
+
+
+class InvertedIndex(VersionedIndex):
+    """Инвертированный индекс: ключ -> отсортированный
+    массив id рецептов, в которые он входит.
+    Каждое изменение увеличивает версию и записывает в кэш
+    id изменённых рецептов, поэтому все процессы дочитывают
+    из базы только их. Без записи в журнале индекс пересобирается.
+    """
+    @abstractmethod
+    def get_pairs(self, recipe_ids=None):
+        """Пары (id рецепта, ключ) в любом порядке.
+        Если передан recipe_ids - только для этих рецептов.
+        """
+
+    def build(self):
+        """Собирает массивы и сортирует их: обновление
+        ищет в них бинарным поиском.
+        """
+        by_key = {}
+        by_recipe = {}
+        for recipe_id, key in self.get_pairs():
+            by_key.setdefault(key, array('q')).append(recipe_id)
+            by_recipe.setdefault(recipe_id, array('q')).append(key)
+        for index in (by_key, by_recipe):
+            for key, values in index.items():
+                index[key] = array('q', sorted(values))
+        return by_key, by_recipe
+
+    def get_log_key(self, version):
+        return f'{self.version_name}:changes:{version}'
+
+    def get_changed_recipes(self, version):
+        """id рецептов, изменённых после загруженной версии.
+        None, если журнал неполон или слишком длинный.
+        """
+        if (self._version is None
+                or not 0 < version - self._version <= CHANGE_LOG_LENGTH):
+            return None
+        keys = [
+            self.get_log_key(number)
+            for number in range(self._version + 1, version + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            return None
+        return set().union(*changes.values())
+
+    def refresh(self, version):
+        recipe_ids = self.get_changed_recipes(version)
+        if recipe_ids is None:
+            return self.build()
+        keys = {recipe_id: [] for recipe_id in recipe_ids}
+        for recipe_id, key in self.get_pairs(recipe_ids):
+            keys[recipe_id].append(key)
+        for recipe_id, recipe_keys in keys.items():
+            self.replace_recipe(recipe_id, recipe_keys)
+        return self._data
+
+    def replace_recipe(self, recipe_id, keys):
+        """Заменяет ключи рецепта в загруженных данных."""
+        by_key, by_recipe = self._data
+        for key in by_recipe.pop(recipe_id, ()):
+            recipes = by_key[key]
+            del recipes[bisect_left(recipes, recipe_id)]
+            if not recipes:
+                del by_key[key]
+        keys = sorted(set(keys))
+        if keys:
+            by_recipe[recipe_id] = array('q', keys)
+        for key in keys:
+            recipes = by_key.setdefault(key, array('q'))
+            recipes.insert(bisect_left(recipes, recipe_id), recipe_id)
+
+    def recipes_changed(self, recipe_ids):
+        """Увеличивает версию и записывает изменённые рецепты в журнал."""
+        version = bump_version(self.version_name)
+        cache.set(self.get_log_key(version), frozenset(recipe_ids),
+                  CHANGE_LOG_TIMEOUT)
+
+    def changed_on_commit(self, *recipe_ids):
+        """Отмечает изменение рецептов после фиксации транзакции."""
+        transaction.on_commit(lambda: self.recipes_changed(recipe_ids))
+
+
+class RecipeIngredientIndex(InvertedIndex):
+    """Индекс ингредиент -> id рецептов для подбора рецептов."""
+    version_name = 'recipe_ingredients'
+
+    def get_pairs(self, recipe_ids=None):
+        pairs = RecipeIngredient.objects.order_by()
+        if recipe_ids is not None:
+            pairs = pairs.filter(recipe_id__in=recipe_ids)
+        return pairs.values_list('recipe_id', 'ingredient_id').iterator()
+
+    def match(self, ingredient_ids, max_missing=0):
+        """Возвращает id рецептов, для которых не хватает
+        не более max_missing ингредиентов.
+        Сначала идут рецепты с меньшим числом недостающих
+        ингредиентов и большей долей имеющихся.
+        """
+        with self._lock:
+            by_ingredient, by_recipe = self.get_data()
+            counts = Counter()
+            for ingredient_id in set(ingredient_ids):
+                counts.update(by_ingredient.get(ingredient_id, ()))
+            matches = [
+                (len(by_recipe[recipe_id]) - matched,
+                 -matched / len(by_recipe[recipe_id]),
+                 -recipe_id)
+                for recipe_id, matched in counts.items()
+                if len(by_recipe[recipe_id]) - matched <= max_missing
+            ]
+        return [-recipe_id for _, _, recipe_id in sorted(matches)]
+
+
+class TagRecipeIndex(InvertedIndex):
+    """Индекс тег -> id рецептов для фильтрации по тегам без JOIN."""
+    version_name = 'recipe_tags'
+
+    def get_pairs(self, recipe_ids=None):
+        pairs = Recipe.tags.through.objects.order_by()
+        if recipe_ids is not None:
+            pairs = pairs.filter(recipe_id__in=recipe_ids)
+        return pairs.values_list('recipe_id', 'tag_id').iterator()
+
+    def count(self, tag_ids):
+        """Верхняя оценка числа рецептов с любым из тегов."""
+        with self._lock:
+            by_tag, _ = self.get_data()
+            return sum(len(by_tag.get(tag_id, ())) for tag_id in tag_ids)
+
+    def get_recipe_ids(self, tag_ids):
+        """Возвращает id рецептов, у которых есть хотя бы один из тегов."""
+        with self._lock:
+            by_tag, _ = self.get_data()
+            recipe_ids = set()
+            for tag_id in tag_ids:
+                recipe_ids.update(by_tag.get(tag_id, ()))
+        return recipe_ids
+
+
+ingredient_index = IngredientIndex()
+recipe_ingredient_index = RecipeIngredientIndex()
+tag_recipe_index = TagRecipeIndex()
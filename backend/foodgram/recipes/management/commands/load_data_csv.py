@@ -1,11 +1,51 @@
 import csv
+import io
+import json
+import time
+from itertools import islice
 
 from django.apps import apps
-from django.core.management import BaseCommand
-from django.shortcuts import get_object_or_404
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, models, transaction
 
+from api.snapshots import update_on_commit
+from recipes.signals import bump_on_commit
 
-MODELS_FIELDS = {}
+MODEL_VERSIONS = {
+    'recipes.ingredient': ('ingredients',),
+    'recipes.tag': ('tags', 'recipes', 'recipe_relations'),
+}
+MODEL_SNAPSHOTS = {
+    'recipes.ingredient': ('ingredients',),
+    'recipes.tag': ('tags',),
+}
+
+
+def get_unique_fields(model):
+    """Возвращает поля естественного ключа модели:
+    первое ограничение уникальности или уникальное поле.
+    """
+    for constraint in model._meta.constraints:
+        if (isinstance(constraint, models.UniqueConstraint)
+                and constraint.condition is None):
+            return [model._meta.get_field(name) for name in constraint.fields]
+    if model._meta.unique_together:
+        return [model._meta.get_field(name)
+                for name in model._meta.unique_together[0]]
+    for field in model._meta.concrete_fields:
+        if field.unique and not field.primary_key:
+            return [field]
+    return []
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
 
 
 class Command(BaseCommand):
@@ -19,16 +59,174 @@ class Command(BaseCommand):
             type=str,
             help="django app name that the model is connected to"
         )
+        parser.add_argument(
+            '--fields',
+            type=str,
+            help="comma separated field names for csv files without header"
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="number of rows written per query"
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="validate and load rows, then roll the transaction back"
+        )
 
     def handle(self, *args, **options):
-        file_path = options['path']
-        model = apps.get_model(options['app_name'], options['model_name'])
-        with open(file_path, 'rt', encoding='utf-8') as csv_file:
-            reader = csv.DictReader(csv_file, delimiter=',')
-            for row in reader:
-                for field, value in row.items():
-                    if field in MODELS_FIELDS.keys():
-                        row[field] = get_object_or_404(
-                            MODELS_FIELDS[field], pk=value
-                        )
-                model.objects.create(**row)
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        self.model = apps.get_model(options['app_name'], options['model_name'])
+        self.related_pks = {}
+        default_fields = [
+            field.name for field in self.model._meta.concrete_fields
+            if not field.primary_key
+        ]
+        if options['fields']:
+            default_fields = options['fields'].split(',')
+        started = time.monotonic()
+        count = 0
+        with open(options['path'], 'rt', encoding='utf-8') as file:
+            if options['path'].endswith('.json'):
+                rows = self.read_json(file)
+            else:
+                rows = self.read_csv(file, default_fields)
+            with transaction.atomic():
+                if connection.vendor == 'postgresql':
+                    load = self.copy_batch
+                else:
+                    load = self.bulk_create_batch
+                for batch in batched(rows, options['batch_size']):
+                    load(batch)
+                    count += len(batch)
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+                else:
+                    label = self.model._meta.label_lower
+                    bump_on_commit(*MODEL_VERSIONS.get(label, ()))
+                    update_on_commit(*MODEL_SNAPSHOTS.get(label, ()))
+        elapsed = time.monotonic() - started
+        message = (
+            f'{count} rows {"checked" if options["dry_run"] else "loaded"} '
+            f'in {elapsed:.2f}s ({count / max(elapsed, 1e-6):.0f} rows/s)'
+        )
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def read_csv(self, file, default_fields):
+        reader = csv.reader(file, delimiter=',')
+        first_row = next(reader, None)
+        if first_row is None:
+            return
+        if self.is_header(first_row):
+            fields = first_row
+        else:
+            fields = default_fields
+            yield self.convert(dict(zip(fields, first_row)))
+        for row in reader:
+            yield self.convert(dict(zip(fields, row)))
+
+    def read_json(self, file):
+        data = json.load(file)
+        if not isinstance(data, list):
+            raise CommandError('JSON file must contain a list of objects')
+        for row in data:
+            yield self.convert(row)
+
+    def is_header(self, row):
+        try:
+            for name in row:
+                self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        return True
+
+    def get_related_pks(self, model):
+        """Загружает id связанной модели одним запросом."""
+        if model not in self.related_pks:
+            self.related_pks[model] = {
+                str(pk) for pk in model.objects.values_list('pk', flat=True)
+            }
+        return self.related_pks[model]
+
+    def convert(self, row):
+        """Приводит значения строки к типам полей модели."""
+        values = {}
+        for name, value in row.items():
+            try:
+                field = self.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                raise CommandError(f'Unknown field: {name}')
+            if field.is_relation:
+                if str(value) not in self.get_related_pks(field.related_model):
+                    raise CommandError(
+                        f'{field.related_model.__name__} '
+                        f'with pk={value} does not exist'
+                    )
+                field = field.target_field
+            try:
+                value = field.to_python(value)
+            except ValidationError as error:
+                raise CommandError(f'{name}: {" ".join(error.messages)}')
+            values[self.model._meta.get_field(name).attname] = value
+        return values
+
+    def bulk_create_batch(self, rows):
+        self.model.objects.bulk_create(
+            (self.model(**row) for row in rows),
+            ignore_conflicts=bool(get_unique_fields(self.model))
+        )
+
+    def copy_batch(self, rows):
+        """Загружает строки через COPY во временную таблицу
+        и переносит их в основную с обновлением по естественному ключу.
+        """
+        table = self.model._meta.db_table
+        attnames = list(rows[0])
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([
+                r'\N' if row.get(attname) is None else row[attname]
+                for attname in attnames
+            ])
+        buffer.seek(0)
+        quote = connection.ops.quote_name
+        columns = [
+            quote(self.model._meta.get_field(attname).column)
+            for attname in attnames
+        ]
+        column_list = ', '.join(columns)
+        key = [
+            quote(field.column) for field in get_unique_fields(self.model)
+        ]
+        distinct = order = conflict = ''
+        if key:
+            distinct = f'DISTINCT ON ({", ".join(key)})'
+            order = f'ORDER BY {", ".join(key)}, ctid DESC'
+            updates = ', '.join(
+                f'{column} = EXCLUDED.{column}'
+                for column in columns if column not in key
+            )
+            conflict = f'ON CONFLICT ({", ".join(key)}) ' + (
+                f'DO UPDATE SET {updates}' if updates else 'DO NOTHING'
+            )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE IF NOT EXISTS load_data '
+                f'ON COMMIT DROP AS SELECT {column_list} '
+                f'FROM {quote(table)} WITH NO DATA'
+            )
+            cursor.copy_expert(
+                f'COPY load_data ({column_list}) '
+                f"FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buffer
+            )
+            cursor.execute(
+                f'INSERT INTO {quote(table)} ({column_list}) '
+                f'SELECT {distinct} {column_list} FROM load_data '
+                f'{order} {conflict}'
+            )
+            cursor.execute('TRUNCATE load_data')
@@ -0,0 +1,45 @@
+from django.core.management import BaseCommand, CommandError
+
+from recipes.models import ShoppingListItem
+
+
+class Command(BaseCommand):
+    help = 'Rebuilding or verifying materialized shopping lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help="only compare shopping lists with the live aggregate"
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify']:
+            ShoppingListItem.objects.rebuild()
+            self.stdout.write(self.style.SUCCESS('Shopping lists rebuilt'))
+            return
+        live = {
+            (user_id, ingredient_id): total_amount
+            for user_id, ingredient_id, total_amount
+            in ShoppingListItem.objects.get_live_totals().iterator()
+        }
+        stored = {
+            (user_id, ingredient_id): total_amount
+            for user_id, ingredient_id, total_amount
+            in ShoppingListItem.objects.values_list(
+                'user', 'ingredient', 'total_amount'
+            ).iterator()
+        }
+        mismatches = [
+            key for key in live.keys() | stored.keys()
+            if live.get(key) != stored.get(key)
+        ]
+        for user_id, ingredient_id in sorted(mismatches):
+            self.stdout.write(
+                f'user={user_id} ingredient={ingredient_id}: '
+                f'stored={stored.get((user_id, ingredient_id))} '
+                f'live={live.get((user_id, ingredient_id))}'
+            )
+        if mismatches:
+            raise CommandError(f'{len(mismatches)} mismatches found')
+        self.stdout.write(self.style.SUCCESS('Shopping lists are consistent'))
@@ -0,0 +1,30 @@
+from django.core.management import BaseCommand, CommandError
+
+from recipes.counters import COUNTERS, reconcile_counter
+
+
+class Command(BaseCommand):
+    help = 'Repairing or verifying denormalized counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help="only report counters that differ from the live count"
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for sender, (model, _, counter) in COUNTERS.items():
+            drifted = reconcile_counter(sender, fix=not options['verify'])
+            total += len(drifted)
+            if drifted:
+                self.stdout.write(
+                    f'{model.__name__}.{counter}: {len(drifted)} drifted'
+                )
+        if not options['verify']:
+            self.stdout.write(self.style.SUCCESS(f'{total} counters repaired'))
+            return
+        if total:
+            raise CommandError(f'{total} counters drifted')
+        self.stdout.write(self.style.SUCCESS('Counters are consistent'))
@@ -0,0 +1,18 @@
+from django.core.management import BaseCommand
+
+from recipes.trending import update_scores
+
+
+class Command(BaseCommand):
+    help = 'Updating time-decayed recipe popularity scores'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help="rebuild scores from scratch instead of updating them"
+        )
+
+    def handle(self, *args, **options):
+        count = update_scores(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'{count} recipes scored'))
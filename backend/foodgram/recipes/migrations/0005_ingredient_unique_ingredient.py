@@ -0,0 +1,49 @@
+# Generated by Django 3.2 on 2026-10-18 21:04
+
+from django.db import migrations, models
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    ShoppingListItem = apps.get_model('recipes', 'ShoppingListItem')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        keep=models.Min('id'), count=models.Count('id')
+    ).filter(count__gt=1).order_by()
+    for duplicate in duplicates:
+        keep = duplicate['keep']
+        others = list(Ingredient.objects.filter(
+            name=duplicate['name'],
+            measurement_unit=duplicate['measurement_unit']
+        ).exclude(id=keep).values_list('id', flat=True))
+        RecipeIngredient.objects.filter(
+            ingredient__in=others
+        ).update(ingredient=keep)
+        for item in ShoppingListItem.objects.filter(ingredient__in=others):
+            kept, created = ShoppingListItem.objects.get_or_create(
+                user_id=item.user_id, ingredient_id=keep,
+                defaults={'total_amount': 0}
+            )
+            kept.total_amount = models.F('total_amount') + item.total_amount
+            kept.save(update_fields=['total_amount'])
+            item.delete()
+        Ingredient.objects.filter(id__in=others).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 3.2 on 2026-10-18 21:32
+
+from django.db import migrations, models
+
+INGREDIENT_NAME_SQL = """
+CREATE INDEX recipes_ingredient_name_upper_idx
+ON recipes_ingredient (UPPER(name::text) text_pattern_ops);
+"""
+
+REVERSE_SQL = """
+DROP INDEX IF EXISTS recipes_ingredient_name_upper_idx;
+"""
+
+
+def merge_duplicate_recipe_ingredients(apps, schema_editor):
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    duplicates = RecipeIngredient.objects.values(
+        'recipe', 'ingredient'
+    ).annotate(
+        keep=models.Min('id'),
+        total=models.Sum('amount'),
+        count=models.Count('id'),
+    ).filter(count__gt=1).order_by()
+    for duplicate in duplicates:
+        RecipeIngredient.objects.filter(
+            recipe=duplicate['recipe'], ingredient=duplicate['ingredient']
+        ).exclude(id=duplicate['keep']).delete()
+        RecipeIngredient.objects.filter(id=duplicate['keep']).update(
+            amount=duplicate['total']
+        )
+
+
+def create_ingredient_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(INGREDIENT_NAME_SQL)
+
+
+def drop_ingredient_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(REVERSE_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_ingredient_unique_ingredient'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_recipe_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredient',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_recipe_ingredient'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-id'], name='recipe_author_id_idx'),
+        ),
+        migrations.RunPython(
+            create_ingredient_name_index, drop_ingredient_name_index
+        ),
+    ]
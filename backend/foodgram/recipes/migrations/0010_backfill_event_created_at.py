@@ -0,0 +1,41 @@
+# Generated by Django 3.2 on 2026-10-18 23:40
+
+import datetime
+
+from django.db import migrations
+from django.db.migrations.recorder import MigrationRecorder
+
+# Добавления в избранное и в список покупок, сделанные до 0008,
+# получили время миграции и выглядели бы для пересчёта популярности
+# одновременным всплеском. Им ставится время вне окна пересчёта.
+BACKFILL_CREATED_AT = datetime.datetime(2000, 1, 1,
+                                        tzinfo=datetime.timezone.utc)
+
+
+def backfill_created_at(apps, schema_editor):
+    """Поле created_at заполнялось одним значением до записи
+    о применении 0008, поэтому строки не позже этой записи
+    существовали до миграции.
+    """
+    alias = schema_editor.connection.alias
+    applied = MigrationRecorder.Migration.objects.using(alias).filter(
+        app='recipes', name='0008_trending'
+    ).values_list('applied', flat=True).first()
+    if applied is None:
+        return
+    for model_name in ('Favorite', 'ShoppingCart'):
+        apps.get_model('recipes', model_name).objects.using(alias).filter(
+            created_at__lte=applied
+        ).update(created_at=BACKFILL_CREATED_AT)
+    apps.get_model('recipes', 'RecipeScore').objects.using(alias).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_feed'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_created_at, migrations.RunPython.noop),
+    ]
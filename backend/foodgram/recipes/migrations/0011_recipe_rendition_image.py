@@ -0,0 +1,45 @@
+# Generated by Django 3.2 on 2026-10-18 21:05
+
+import os
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+# Копии из recipes.images: модуль при импорте запускает пул потоков.
+RENDITIONS = ('thumbnail', 'detail')
+
+
+def get_rendition_name(name, rendition):
+    directory, filename = os.path.split(name)
+    base, _ = os.path.splitext(filename)
+    return os.path.join(directory, 'renditions', f'{base}_{rendition}.webp')
+
+
+def backfill_rendition_image(apps, schema_editor):
+    """Отмечает рецепты, для картинок которых копии уже созданы."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    recipes = Recipe.objects.using(schema_editor.connection.alias)
+    names = recipes.exclude(image='').values_list(
+        'image', flat=True
+    ).distinct()
+    for name in names.iterator():
+        if all(default_storage.exists(get_rendition_name(name, rendition))
+               for rendition in RENDITIONS):
+            recipes.filter(image=name).update(rendition_image=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_backfill_event_created_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='rendition_image',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Картинка с готовыми копиями'),
+        ),
+        migrations.RunPython(backfill_rendition_image,
+                             migrations.RunPython.noop),
+    ]
@@ -1,7 +1,8 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import models, transaction
 
-from users.models import User
+from users.models import Subscription, User
 
 
 class Tag(models.Model):
@@ -42,11 +43,68 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            )
+        ]
 
     def __str__(self):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    def with_related(self, fields=None):
+        """Подгружает автора, теги и ингредиенты рецептов.
+        fields - поля ответа, связи вне этого списка не загружаются,
+        а текст рецепта откладывается.
+        """
+        queryset = self
+        if fields is None or 'author' in fields:
+            queryset = queryset.select_related('author')
+        if fields is None or 'tags' in fields:
+            queryset = queryset.prefetch_related(
+                models.Prefetch('tags', queryset=Tag.objects.all())
+            )
+        if fields is None or 'ingredients' in fields:
+            queryset = queryset.prefetch_related(models.Prefetch(
+                'recipeingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient'
+                )
+            ))
+        if fields is not None and 'text' not in fields:
+            queryset = queryset.defer('text')
+        return queryset
+
+    def with_user_flags(self, user, fields=None):
+        """Добавляет признаки избранного, списка покупок
+        и подписки на автора для текущего пользователя.
+        fields - поля ответа, признаки вне этого списка не вычисляются.
+        """
+        if not user.is_authenticated:
+            return self
+        flags = {
+            'is_favorited': models.Exists(Favorite.objects.filter(
+                user=user, recipe=models.OuterRef('pk')
+            )),
+            'is_in_shopping_cart': models.Exists(ShoppingCart.objects.filter(
+                user=user, recipe=models.OuterRef('pk')
+            )),
+            'author_is_subscribed': models.Exists(Subscription.objects.filter(
+                user=user, author=models.OuterRef('author')
+            )),
+        }
+        if fields is not None:
+            flags = {
+                name: flag for name, flag in flags.items()
+                if name in fields
+                or name == 'author_is_subscribed' and 'author' in fields
+            }
+        return self.annotate(**flags)
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User,
@@ -63,6 +121,12 @@ class Recipe(models.Model):
         upload_to='recipes/',
         blank=True,
     )
+    rendition_image = models.CharField(
+        'Картинка с готовыми копиями',
+        max_length=100,
+        blank=True,
+        editable=False,
+    )
     text = models.TextField(
         'Описание',
     )
@@ -83,11 +147,42 @@ class Recipe(models.Model):
             )
         ]
     )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+    )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False,
+    )
+    favorites_count = models.IntegerField(
+        'В избранном',
+        default=0,
+        editable=False,
+    )
+    carts_count = models.IntegerField(
+        'В списках покупок',
+        default=0,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ['-id']
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['author', '-id'],
+                name='recipe_author_id_idx'
+            ),
+            models.Index(
+                fields=['-favorites_count', '-id'],
+                name='recipe_favorites_count_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -119,6 +214,12 @@ class RecipeIngredient(models.Model):
     class Meta:
         verbose_name = 'Ингредиент в рецепте'
         verbose_name_plural = 'Ингредиенты в рецепте'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'ingredient'],
+                name='unique_recipe_ingredient'
+            )
+        ]
 
 
 class Favorite(models.Model):
@@ -134,6 +235,11 @@ class Favorite(models.Model):
         related_name='favorites',
         verbose_name='Рецепт',
     )
+    created_at = models.DateTimeField(
+        'Дата добавления',
+        auto_now_add=True,
+        db_index=True,
+    )
 
     class Meta:
         ordering = ['-id']
@@ -163,6 +269,11 @@ class ShoppingCart(models.Model):
         related_name='carts',
         verbose_name='Рецепт'
     )
+    created_at = models.DateTimeField(
+        'Дата добавления',
+        auto_now_add=True,
+        db_index=True,
+    )
 
     class Meta:
         ordering = ['-id']
@@ -178,3 +289,175 @@ class ShoppingCart(models.Model):
     def __str__(self):
         return (f'{self.user.username} добавил'
                 f'{self.recipe.name} в список покупок')
+
+
+class ShoppingListItemQuerySet(models.QuerySet):
+    def apply_amounts(self, user_ids, amounts):
+        """Изменяет количество ингредиентов в списках покупок.
+        amounts - словарь {id ингредиента: изменение количества}.
+        """
+        user_ids = list(user_ids)
+        amounts = {
+            ingredient_id: amount
+            for ingredient_id, amount in amounts.items() if amount
+        }
+        if not user_ids or not amounts:
+            return
+        self.bulk_create(
+            [
+                self.model(user_id=user_id, ingredient_id=ingredient_id,
+                           total_amount=0)
+                for user_id in user_ids for ingredient_id in amounts
+            ],
+            ignore_conflicts=True
+        )
+        items = self.filter(user__in=user_ids, ingredient__in=amounts)
+        items.update(total_amount=models.F('total_amount') + models.Case(
+            *[
+                models.When(ingredient=ingredient_id,
+                            then=models.Value(amount))
+                for ingredient_id, amount in amounts.items()
+            ],
+            default=models.Value(0)
+        ))
+        items.filter(total_amount__lte=0).delete()
+
+    def add_recipe(self, user_ids, recipe_id, sign=1):
+        """Добавляет ингредиенты рецепта в списки покупок
+        (при sign=-1 - вычитает).
+        """
+        amounts = RecipeIngredient.objects.filter(
+            recipe=recipe_id
+        ).values_list('ingredient').annotate(models.Sum('amount'))
+        self.apply_amounts(user_ids, {
+            ingredient_id: sign * amount
+            for ingredient_id, amount in amounts
+        })
+
+    def get_live_totals(self):
+        """Считает списки покупок заново по рецептам в корзинах."""
+        return RecipeIngredient.objects.filter(
+            recipe__carts__isnull=False
+        ).values_list(
+            'recipe__carts__user', 'ingredient'
+        ).annotate(models.Sum('amount'))
+
+    def rebuild(self):
+        """Пересобирает списки покупок всех пользователей."""
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create((
+                self.model(user_id=user_id, ingredient_id=ingredient_id,
+                           total_amount=total_amount)
+                for user_id, ingredient_id, total_amount
+                in self.get_live_totals().iterator()
+            ), batch_size=1000)
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент'
+    )
+    total_amount = models.IntegerField(
+        'Количество',
+        default=0
+    )
+
+    objects = ShoppingListItemQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_user_ingredient_shopping_list'
+            )
+        ]
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списках покупок'
+
+    def __str__(self):
+        return (f'{self.user.username}: {self.ingredient.name} - '
+                f'{self.total_amount}')
+
+
+class RecipeScore(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+        verbose_name='Рецепт'
+    )
+    score = models.FloatField(
+        'Популярность',
+        db_index=True,
+    )
+    updated_at = models.DateTimeField(
+        'Дата пересчёта',
+    )
+
+    class Meta:
+        ordering = ['-score']
+        verbose_name = 'Популярность рецепта'
+        verbose_name_plural = 'Популярность рецептов'
+
+    def __str__(self):
+        return f'{self.recipe.name}: {self.score:.2f}'
+
+
+class FeedInbox(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='feed_inbox',
+        verbose_name='Пользователь'
+    )
+    created_at = models.DateTimeField(
+        'Дата создания',
+        auto_now_add=True,
+    )
+
+    class Meta:
+        verbose_name = 'Лента подписок'
+        verbose_name_plural = 'Ленты подписок'
+
+    def __str__(self):
+        return f'Лента {self.user.username}'
+
+
+class FeedItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Пользователь'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Рецепт'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_user_recipe_feed'
+            )
+        ]
+        verbose_name = 'Рецепт в ленте'
+        verbose_name_plural = 'Рецепты в лентах'
+
+    def __str__(self):
+        return f'{self.user.username}: {self.recipe.name}'
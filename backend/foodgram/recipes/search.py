@@ -0,0 +1,85 @@
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            TrigramSimilarity)
+from django.db import connection
+from django.db.models import Case, F, Q, When
+
+SEARCH_CONFIG = 'russian'
+NAME_WEIGHT = 1.0
+TEXT_WEIGHT = 0.4
+SIMILARITY_THRESHOLD = 0.3
+
+
+@lru_cache(maxsize=None)
+def has_trigram_support():
+    """Проверяет, установлено ли в базе расширение pg_trgm."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def search_postgres(queryset, query):
+    """Полнотекстовый поиск по названию и описанию рецепта
+    с учётом опечаток в названии.
+    """
+    search_query = SearchQuery(query, config=SEARCH_CONFIG,
+                               search_type='websearch')
+    condition = Q(search_vector=search_query)
+    ordering = ['-search_rank']
+    queryset = queryset.annotate(
+        search_rank=SearchRank(F('search_vector'), search_query)
+    )
+    if has_trigram_support():
+        queryset = queryset.annotate(
+            search_similarity=TrigramSimilarity('name', query)
+        )
+        condition |= Q(name__trigram_similar=query)
+        ordering.append('-search_similarity')
+    return queryset.filter(condition).order_by(*ordering, '-id')
+
+
+def get_score(query, name, text):
+    """Оценивает совпадение рецепта с запросом
+    аналогично весам полнотекстового поиска.
+    """
+    query = query.casefold()
+    name = name.casefold()
+    text = text.casefold()
+    score = 0
+    for word in query.split():
+        if word in name:
+            score += NAME_WEIGHT
+        if word in text:
+            score += TEXT_WEIGHT
+    if score:
+        return score
+    similarity = SequenceMatcher(None, query, name).ratio()
+    return similarity if similarity >= SIMILARITY_THRESHOLD else 0
+
+
+def search_python(queryset, query):
+    """Поиск на стороне Python для баз без полнотекстового поиска."""
+    scores = {}
+    for recipe_id, name, text in queryset.values_list(
+        'id', 'name', 'text'
+    ).iterator():
+        score = get_score(query, name, text)
+        if score:
+            scores[recipe_id] = score
+    if not scores:
+        return queryset.none()
+    ranked = sorted(scores, key=lambda recipe_id: (-scores[recipe_id],
+                                                   -recipe_id))
+    return queryset.filter(id__in=ranked).order_by(Case(*[
+        When(id=recipe_id, then=position)
+        for position, recipe_id in enumerate(ranked)
+    ]))
+
+
+def search_recipes(queryset, query):
+    """Поиск рецептов по названию и описанию."""
+    if connection.vendor == 'postgresql':
+        return search_postgres(queryset, query)
+    return search_python(queryset, query)
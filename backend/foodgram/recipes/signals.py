@@ -0,0 +1,137 @@
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from recipes import feed
+from recipes.counters import update_counter
+from recipes.images import schedule_renditions
+from recipes.indexes import recipe_ingredient_index, tag_recipe_index
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, ShoppingListItem, Tag)
+from recipes.versions import bump_version
+from users.models import Subscription, User
+
+
+def bump_on_commit(*names):
+    """Увеличивает версии данных после фиксации транзакции."""
+    def bump():
+        for name in names:
+            bump_version(name)
+    transaction.on_commit(bump)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    bump_on_commit('ingredients')
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    tag_recipe_index.changed_on_commit(instance.id)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    bump_on_commit('recipes', f'recipe:{instance.id}')
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    name = instance.image.name
+    if name and name != instance.rendition_image:
+        transaction.on_commit(lambda: schedule_renditions(name))
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    bump_on_commit('recipes', f'recipe:{instance.recipe_id}')
+    recipe_ingredient_index.changed_on_commit(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set,
+                        **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        bump_on_commit('recipes', f'recipe:{instance.id}')
+        tag_recipe_index.changed_on_commit(instance.id)
+        return
+    bump_on_commit('recipes', 'recipe_relations')
+    if pk_set is None:
+        bump_on_commit('recipe_tags')
+    else:
+        tag_recipe_index.changed_on_commit(*pk_set)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(sender, **kwargs):
+    bump_on_commit('tags', 'recipe_tags')
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+@receiver((post_save, post_delete), sender=Subscription)
+def user_relation_changed(sender, instance, **kwargs):
+    bump_on_commit(f'user:{instance.user_id}')
+
+
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=User)
+def recipe_relation_changed(sender, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    bump_on_commit('recipes', 'recipe_relations')
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Subscription)
+def counter_object_created(sender, instance, created, **kwargs):
+    if created:
+        update_counter(instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Subscription)
+def counter_object_deleted(sender, instance, **kwargs):
+    update_counter(instance, -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def cart_created(sender, instance, created, **kwargs):
+    if created:
+        ShoppingListItem.objects.add_recipe(
+            [instance.user_id], instance.recipe_id
+        )
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def cart_deleted(sender, instance, **kwargs):
+    """Ингредиенты вычитаются до удаления: при каскадном удалении
+    рецепта или автора они могут быть удалены раньше корзин.
+    """
+    ShoppingListItem.objects.add_recipe(
+        [instance.user_id], instance.recipe_id, sign=-1
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: feed.push_recipe(instance))
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(sender, instance, created, **kwargs):
+    if created:
+        feed.subscribe(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    feed.unsubscribe(instance.user_id, instance.author_id)
@@ -0,0 +1,25 @@
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CacheTestCase(TestCase):
+    """Тесты с кэшем в памяти процесса, который очищается
+    перед каждым тестом. Версии данных и кэши ответов
+    не переходят из теста в тест.
+    """
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CacheTransactionTestCase(TransactionTestCase):
+    """То же для тестов с настоящими транзакциями."""
+    def setUp(self):
+        super().setUp()
+        cache.clear()
@@ -0,0 +1,241 @@
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from recipes.indexes import (TagRecipeIndex, ingredient_index,
+                             recipe_ingredient_index, tag_recipe_index)
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.tests.base import CacheTestCase
+from recipes.versions import bump_version, get_version
+from users.models import User
+
+
+class IngredientIndexTest(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        Ingredient.objects.bulk_create([
+            Ingredient(name=name, measurement_unit='г')
+            for name in ('сыр', 'сырок', 'Сыр плавленый', 'творожный сыр',
+                         'соль')
+        ])
+        bump_version('ingredients')
+
+    def search(self, query, limit=10):
+        return [
+            ingredient.name
+            for ingredient in ingredient_index.search(query, limit)
+        ]
+
+    def test_ranking(self):
+        self.assertEqual(
+            self.search('Сыр'),
+            ['сыр', 'Сыр плавленый', 'сырок', 'творожный сыр']
+        )
+
+    def test_limit(self):
+        self.assertEqual(self.search('сыр', 2), ['сыр', 'Сыр плавленый'])
+
+    def test_rebuilt_after_version_bump(self):
+        """Загрузка без сигналов, как в load_data_csv или в другом
+        процессе, видна после увеличения версии.
+        """
+        self.assertEqual(self.search('свёкл'), [])
+        Ingredient.objects.bulk_create([
+            Ingredient(name='свёкла', measurement_unit='г')
+        ])
+        self.assertEqual(self.search('свёкл'), [])
+        bump_version('ingredients')
+        self.assertEqual(self.search('свёкл'), ['свёкла'])
+
+    def test_rebuilt_after_save(self):
+        ingredient = Ingredient.objects.get(name='соль')
+        ingredient.name = 'соль морская'
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient.save()
+        self.assertEqual(self.search('соль'), ['соль морская'])
+
+    def test_version_bumped_after_commit(self):
+        """До фиксации другие процессы не видят изменений
+        и не должны сохранить старые данные под новой версией.
+        """
+        version = get_version('ingredients')
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='перец', measurement_unit='г')
+            self.assertEqual(get_version('ingredients'), version)
+        self.assertNotEqual(get_version('ingredients'), version)
+
+
+class RecipeIngredientIndexTest(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(
+            username='cook', email='cook@example.com',
+            first_name='Повар', last_name='Поваров'
+        )
+        self.tag = Tag.objects.create(name='Ужин', color='#000000',
+                                      slug='dinner')
+        self.ingredients = [
+            Ingredient.objects.create(name=f'ингредиент {number}',
+                                      measurement_unit='г')
+            for number in range(4)
+        ]
+        self.recipes = [
+            self.create_recipe(name, ingredients) for name, ingredients in (
+                ('первый', self.ingredients[:2]),
+                ('второй', self.ingredients[1:3]),
+                ('третий', self.ingredients[2:3]),
+            )
+        ]
+        bump_version('recipe_ingredients')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, name, ingredients):
+        recipe = Recipe.objects.create(
+            author=self.user, name=name, text='текст', cooking_time=10
+        )
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+            for ingredient in ingredients
+        ])
+        return recipe
+
+    def match(self, ingredients, max_missing=0):
+        return recipe_ingredient_index.match(
+            [ingredient.id for ingredient in ingredients], max_missing
+        )
+
+    def assertIndexMatchesDatabase(self):
+        self.assertEqual(recipe_ingredient_index.get_data(),
+                         recipe_ingredient_index.build())
+
+    def test_match(self):
+        first, second, third = self.recipes
+        self.assertEqual(self.match(self.ingredients[1:3]), [third.id,
+                                                             second.id])
+        self.assertEqual(self.match(self.ingredients[2:3], 1),
+                         [third.id, second.id])
+
+    def test_recipe_update(self):
+        first, second, third = self.recipes
+        self.match(self.ingredients)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/recipes/{first.id}/',
+                {
+                    'ingredients': [
+                        {'id': ingredient.id, 'amount': 2}
+                        for ingredient in self.ingredients[2:]
+                    ],
+                    'tags': [self.tag.id],
+                },
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.match(self.ingredients[:2]), [])
+        self.assertEqual(self.match(self.ingredients[2:]),
+                         [third.id, first.id])
+        self.assertIndexMatchesDatabase()
+
+    def test_recipe_delete(self):
+        first, second, third = self.recipes
+        self.match(self.ingredients)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f'/api/recipes/{second.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.match(self.ingredients),
+                         [third.id, first.id])
+        self.assertIndexMatchesDatabase()
+
+    def test_recipe_ingredient_saved(self):
+        """Правки строк рецепта в обход API, например в админке."""
+        first, second, third = self.recipes
+        self.match(self.ingredients)
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeIngredient.objects.create(
+                recipe=third, ingredient=self.ingredients[3], amount=1
+            )
+        self.assertEqual(self.match(self.ingredients[2:]), [third.id])
+        recipe_ingredient = third.recipeingredients.get(
+            ingredient=self.ingredients[2]
+        )
+        recipe_ingredient.ingredient = self.ingredients[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe_ingredient.save()
+        self.assertEqual(self.match([self.ingredients[0],
+                                     self.ingredients[3]]), [third.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            first.recipeingredients.get(
+                ingredient=self.ingredients[1]
+            ).delete()
+        self.assertEqual(self.match(self.ingredients[:1]), [first.id])
+        self.assertIndexMatchesDatabase()
+
+
+class RecordingTagRecipeIndex(TagRecipeIndex):
+    """Индекс другого процесса, который запоминает,
+    какие рецепты он читал из базы.
+    """
+    def __init__(self):
+        super().__init__()
+        self.requested = []
+
+    def get_pairs(self, recipe_ids=None):
+        self.requested.append(recipe_ids)
+        return super().get_pairs(recipe_ids)
+
+
+class TagRecipeIndexTest(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(
+            username='cook', email='cook@example.com',
+            first_name='Повар', last_name='Поваров'
+        )
+        self.tags = [
+            Tag.objects.create(name=f'тег {number}', color=f'#00000{number}',
+                               slug=f'tag{number}')
+            for number in range(3)
+        ]
+        self.recipes = [
+            Recipe.objects.create(author=self.user, name=f'рецепт {number}',
+                                  text='текст', cooking_time=10)
+            for number in range(3)
+        ]
+        for recipe, tag in zip(self.recipes, self.tags):
+            recipe.tags.add(tag)
+        bump_version('recipe_tags')
+        self.worker = RecordingTagRecipeIndex()
+        self.worker.get_data()
+        self.worker.requested.clear()
+
+    def assertWorkerMatchesDatabase(self):
+        self.assertEqual(self.worker.get_data(), tag_recipe_index.build())
+
+    def test_recipe_tags_changed(self):
+        first, second, third = self.recipes
+        with self.captureOnCommitCallbacks(execute=True):
+            first.tags.set(self.tags[1:])
+        self.assertWorkerMatchesDatabase()
+        self.assertEqual(self.worker.requested, [{first.id}])
+        self.assertEqual(
+            self.worker.get_recipe_ids([self.tags[1].id]),
+            {first.id, second.id}
+        )
+
+    def test_tag_recipes_changed(self):
+        first, second, third = self.recipes
+        changed_ids = {second.id, third.id}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tags[0].recipe_set.add(second, third)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertWorkerMatchesDatabase()
+        self.assertEqual(self.worker.requested, [changed_ids])
+
+    def test_rebuilt_without_change_log(self):
+        first = self.recipes[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            first.tags.clear()
+        cache.delete(self.worker.get_log_key(get_version('recipe_tags')))
+        self.assertWorkerMatchesDatabase()
+        self.assertEqual(self.worker.requested, [None])
@@ -0,0 +1,109 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart)
+from users.models import Subscription, User
+
+USERS_COUNT = 50
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Планы запросов PostgreSQL')
+class QueryPlanTest(TestCase):
+    """Горячие запросы обслуживаются индексами.
+    Связи заполнены полностью, поэтому избирателен только
+    составной индекс. Последовательное чтение отключено,
+    чтобы на маленьких таблицах план всё равно шёл по индексу.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create([
+            User(username=f'user{number}', email=f'user{number}@example.com',
+                 first_name='Имя', last_name='Фамилия')
+            for number in range(USERS_COUNT)
+        ])
+        cls.ingredients = Ingredient.objects.bulk_create([
+            Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+            for number in range(50)
+        ])
+        cls.recipes = Recipe.objects.bulk_create([
+            Recipe(author=cls.users[number % USERS_COUNT],
+                   name=f'Рецепт {number}', text='текст', cooking_time=10,
+                   image='recipes/image.png')
+            for number in range(100)
+        ])
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+            for recipe in cls.recipes
+            for ingredient in cls.ingredients
+        ])
+        for model in (Favorite, ShoppingCart):
+            model.objects.bulk_create([
+                model(user=user, recipe=recipe)
+                for user in cls.users
+                for recipe in cls.recipes
+            ])
+        Subscription.objects.bulk_create([
+            Subscription(user=user, author=author)
+            for user in cls.users
+            for author in cls.users
+            if author != user
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+        self.addCleanup(self.reset_seqscan)
+
+    def reset_seqscan(self):
+        with connection.cursor() as cursor:
+            cursor.execute('RESET enable_seqscan')
+
+    def assertUsesIndex(self, queryset, index_name):
+        """Индекс ограничения уникальности называется так же,
+        как ограничение.
+        """
+        self.assertIn(index_name, queryset.explain())
+
+    def test_user_recipe_lookups(self):
+        user, recipe = self.users[3], self.recipes[10]
+        for model, name in ((Favorite, 'unique_user_recipe_favorite'),
+                            (ShoppingCart, 'unique_user_recipe_cart')):
+            with self.subTest(model=model.__name__):
+                self.assertUsesIndex(
+                    model.objects.filter(user=user, recipe=recipe).order_by(),
+                    name
+                )
+
+    def test_subscription_lookup(self):
+        self.assertUsesIndex(
+            Subscription.objects.filter(
+                user=self.users[1], author=self.users[2]
+            ).order_by(),
+            'unique_user_author'
+        )
+
+    def test_recipe_ingredient_lookup(self):
+        self.assertUsesIndex(
+            RecipeIngredient.objects.filter(
+                recipe=self.recipes[5], ingredient=self.ingredients[5]
+            ),
+            'unique_recipe_ingredient'
+        )
+
+    def test_ingredient_name_prefix(self):
+        self.assertUsesIndex(
+            Ingredient.objects.filter(name__istartswith='ИНГРЕДИЕНТ 1'),
+            'recipes_ingredient_name_upper_idx'
+        )
+
+    def test_author_recent_recipes(self):
+        self.assertUsesIndex(
+            Recipe.objects.filter(author=self.users[4]).order_by('-id')[:3],
+            'recipe_author_id_idx'
+        )
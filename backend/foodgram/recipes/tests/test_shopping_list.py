@@ -0,0 +1,68 @@
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, ShoppingListItem)
+from recipes.tests.base import CacheTestCase
+from users.models import User
+
+
+class ShoppingListTest(CacheTestCase):
+    """Списки покупок следуют за корзинами при любом способе удаления."""
+
+    def setUp(self):
+        super().setUp()
+        self.user, self.author = [
+            User.objects.create(username=username,
+                                email=f'{username}@example.com',
+                                first_name='Имя', last_name='Фамилия')
+            for username in ('buyer', 'author')
+        ]
+        self.flour, self.salt = [
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('мука', 'соль')
+        ]
+        self.bread = self.create_recipe({self.flour: 500, self.salt: 5})
+        self.cake = self.create_recipe({self.flour: 200})
+        for recipe in (self.bread, self.cake):
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+
+    def create_recipe(self, amounts):
+        recipe = Recipe.objects.create(
+            author=self.author, name='Рецепт', text='текст', cooking_time=10
+        )
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                             amount=amount)
+            for ingredient, amount in amounts.items()
+        ])
+        return recipe
+
+    def assertShoppingList(self, expected):
+        self.assertEqual(dict(ShoppingListItem.objects.filter(
+            user=self.user
+        ).values_list('ingredient', 'total_amount')), {
+            ingredient.id: amount for ingredient, amount in expected.items()
+        })
+        self.assertEqual(
+            sorted(ShoppingListItem.objects.values_list(
+                'user', 'ingredient', 'total_amount'
+            )),
+            sorted(ShoppingListItem.objects.get_live_totals())
+        )
+
+    def test_cart_added(self):
+        self.assertShoppingList({self.flour: 700, self.salt: 5})
+
+    def test_cart_instance_deleted(self):
+        ShoppingCart.objects.get(user=self.user, recipe=self.cake).delete()
+        self.assertShoppingList({self.flour: 500, self.salt: 5})
+
+    def test_cart_queryset_deleted(self):
+        ShoppingCart.objects.filter(user=self.user).delete()
+        self.assertShoppingList({})
+
+    def test_recipe_deleted(self):
+        self.bread.delete()
+        self.assertShoppingList({self.flour: 200})
+
+    def test_author_deleted(self):
+        self.author.delete()
+        self.assertShoppingList({})
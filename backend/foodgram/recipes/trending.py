@@ -0,0 +1,77 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from recipes.models import Favorite, RecipeScore, ShoppingCart
+
+EVENT_WEIGHTS = {
+    Favorite: 1.0,
+    ShoppingCart: 0.5,
+}
+MIN_SCORE = 0.01
+FULL_WINDOW_HALF_LIVES = 10
+
+
+def get_half_life():
+    return timedelta(hours=settings.TRENDING_HALF_LIFE_HOURS)
+
+
+def get_decay(seconds):
+    """Множитель затухания за указанное число секунд."""
+    return 0.5 ** (seconds / get_half_life().total_seconds())
+
+
+def collect_scores(since, now):
+    """Суммирует вклад добавлений в избранное и в список покупок,
+    сделанных после since, с учётом затухания к моменту now.
+    """
+    scores = defaultdict(float)
+    for model, weight in EVENT_WEIGHTS.items():
+        events = model.objects.filter(
+            created_at__gt=since, created_at__lte=now
+        ).order_by().values_list('recipe', 'created_at')
+        for recipe_id, created_at in events.iterator():
+            scores[recipe_id] += weight * get_decay(
+                (now - created_at).total_seconds()
+            )
+    return scores
+
+
+@transaction.atomic
+def update_scores(full=False, now=None):
+    """Пересчитывает таблицу популярности.
+    Существующие оценки затухают за время с прошлого пересчёта,
+    затем к ним добавляются новые события. При full=True
+    таблица собирается заново по событиям за последние
+    FULL_WINDOW_HALF_LIVES периодов полураспада.
+    Возвращает число рецептов в таблице.
+    """
+    now = now or timezone.now()
+    last_run = RecipeScore.objects.aggregate(
+        last_run=Max('updated_at')
+    )['last_run']
+    if full or last_run is None:
+        RecipeScore.objects.all().delete()
+        since = now - get_half_life() * FULL_WINDOW_HALF_LIVES
+    else:
+        since = last_run
+        RecipeScore.objects.update(
+            score=F('score') * get_decay((now - last_run).total_seconds()),
+            updated_at=now,
+        )
+    scores = collect_scores(since, now)
+    existing = RecipeScore.objects.in_bulk(scores.keys())
+    for recipe_id, score in existing.items():
+        score.score += scores.pop(recipe_id)
+    RecipeScore.objects.bulk_update(existing.values(), ['score'],
+                                    batch_size=1000)
+    RecipeScore.objects.bulk_create((
+        RecipeScore(recipe_id=recipe_id, score=score, updated_at=now)
+        for recipe_id, score in scores.items()
+    ), batch_size=1000)
+    RecipeScore.objects.filter(score__lt=MIN_SCORE).delete()
+    return RecipeScore.objects.count()
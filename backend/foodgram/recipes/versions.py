@@ -0,0 +1,28 @@
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+
+
+def get_version(name):
+    """Возвращает текущую версию данных с указанным именем."""
+    return cache.get_or_set(f'version:{name}', time.time_ns, None)
+
+
+def get_modified(name):
+    """Возвращает время последнего изменения данных с указанным именем."""
+    return datetime.fromtimestamp(
+        cache.get_or_set(f'modified:{name}', time.time, None), timezone.utc
+    )
+
+
+def bump_version(name):
+    """Увеличивает версию данных, сбрасывая зависящие от неё кэши."""
+    key = f'version:{name}'
+    cache.set(f'modified:{name}', time.time(), None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(key, version, None)
+        return version
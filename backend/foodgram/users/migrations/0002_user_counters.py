@@ -0,0 +1,44 @@
+# Generated by Django 3.2 on 2026-10-18 22:04
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_user_counters(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    counters = {
+        'recipes_count': apps.get_model('recipes', 'Recipe'),
+        'followers_count': apps.get_model('users', 'Subscription'),
+    }
+    User.objects.update(**{
+        counter: Coalesce(models.Subquery(
+            model.objects.filter(
+                author=models.OuterRef('pk')
+            ).order_by().values('author').annotate(
+                total=models.Count('pk')
+            ).values('total')
+        ), 0)
+        for counter, model in counters.items()
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0001_initial'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Количество подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='recipes_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Количество рецептов'),
+        ),
+        migrations.RunPython(fill_user_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-18 19:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['username'], name='user_username_pattern_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -38,6 +38,16 @@ class User(AbstractUser):
         blank=False,
         null=False,
     )
+    recipes_count = models.IntegerField(
+        'Количество рецептов',
+        default=0,
+        editable=False,
+    )
+    followers_count = models.IntegerField(
+        'Количество подписчиков',
+        default=0,
+        editable=False,
+    )
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
@@ -45,6 +55,13 @@ class User(AbstractUser):
         ordering = ['id']
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
+        indexes = [
+            models.Index(
+                fields=['username'],
+                name='user_username_pattern_idx',
+                opclasses=['varchar_pattern_ops']
+            )
+        ]
 
     def __str__(self):
         return self.username
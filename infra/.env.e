@@ -4,4 +4,6 @@ DB_NAME=postgres # имя базы данных
 POSTGRES_USER=postgres # логин для подключения к базе данных
 POSTGRES_PASSWORD=postgres # пароль для подключения к БД
 DB_HOST=db # название сервиса (контейнера)
-DB_PORT=5432 # порт для подключения к БД
\ No newline at end of file
+DB_PORT=5432 # порт для подключения к БД
+CACHE_BACKEND=django.core.cache.backends.memcached.PyMemcacheCache # общий кэш для всех процессов
+CACHE_LOCATION=memcached:11211 # адрес сервиса memcached